@@ -56,6 +56,8 @@ echo ""
 nohup python -m uvicorn src.api.app:app \
     --host 0.0.0.0 \
     --port 8080 \
+    --loop uvloop \
+    --http httptools \
     > server.log 2>&1 &
 
 # Store PID for later reference
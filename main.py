@@ -1,14 +1,21 @@
+import os
+
 import uvicorn
 from src.config import config
 
 
 def main():
     """Run the application server."""
+    # Each worker is a separate process that builds its own clients
+    # (GA4, LLM) lazily, so nothing is created here before the fork
     uvicorn.run(
         "src.api.app:app",
         host=config.server.host,
         port=config.server.port,
         reload=False,
+        loop="uvloop",
+        http="httptools",
+        workers=config.server.workers or os.cpu_count(),
         log_level=config.log_level.lower(),
     )
 
@@ -2,4 +2,4 @@ from .base import BaseAgent, AgentResponse
 from .analytics_agent import AnalyticsAgent
 from .seo_agent import SEOAgent
 
-__all__ = ["BaseAgent", "AgentResponse", "AnalyticsAgent", "SEOAgent"]
\ No newline at end of file
+__all__ = ["BaseAgent", "AgentResponse", "AnalyticsAgent", "SEOAgent"]
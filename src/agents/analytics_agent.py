@@ -1,31 +1,65 @@
 """
 Analytics Agent for Google Analytics 4 (GA4) queries.
 Tier 1 implementation.
+
+The google-analytics-data client and its protobuf types are imported
+lazily, on the first GA4 call, to keep module import and worker start-up
+cheap.
 """
+from __future__ import annotations
+
+import re
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Optional
+import functools
+import threading
+from typing import TYPE_CHECKING, Any, Optional, TypedDict, Union
 from datetime import datetime, timedelta
 
-from google.analytics.data_v1beta import BetaAnalyticsDataClient
-from google.analytics.data_v1beta.types import (
-    RunReportRequest,
-    DateRange,
-    Dimension,
-    Metric,
-    FilterExpression,
-    Filter,
-    OrderBy,
-)
-from google.oauth2 import service_account
+import numpy as np
+import orjson
+
+if TYPE_CHECKING:
+    from google.analytics.data_v1beta import BetaAnalyticsDataClient
+    from google.analytics.data_v1beta.types import RunReportRequest, RunReportResponse
 
 from .base import BaseAgent, AgentResponse
+from .analytics_scheduler import AnalyticsBatchScheduler
 from src.config import config
-from src.utils import llm_client
+from src.utils import llm_client, extract_json, LLMCache, LLMUsage, make_key, normalize_query
 
 logger = logging.getLogger(__name__)
 
 
+GA4Value = Union[str, int, float]
+GA4Row = dict[str, GA4Value]
+
+
+class GA4DateRange(TypedDict):
+    start: str
+    end: str
+
+
+class GA4ReportMetadata(TypedDict):
+    metrics: list[str]
+    dimensions: list[str]
+    date_range: GA4DateRange
+
+
+class GA4Report(TypedDict):
+    """Columnar GA4 report: one NumPy array per dimension/metric header."""
+    columns: dict[str, np.ndarray]
+    dimension_headers: list[str]
+    metric_headers: list[str]
+    metric_types: dict[str, str]
+    totals: dict[str, Union[int, float]]
+    row_count: int
+    metadata: GA4ReportMetadata
+
+
 # Allowlist of valid GA4 metrics and dimensions for validation
 VALID_METRICS = {
     "activeUsers", "newUsers", "totalUsers", "sessions", "sessionsPerUser",
@@ -48,6 +82,57 @@ VALID_DIMENSIONS = {
     "eventName", "hostName",
 }
 
+
+def _trigrams(text: str) -> set[str]:
+    """Return the set of 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _build_trigram_index(names_lc: tuple[str, ...]) -> dict[str, list[int]]:
+    """Map every trigram to the indices of the names containing it."""
+    index: dict[str, list[int]] = {}
+    for i, name in enumerate(names_lc):
+        for gram in _trigrams(name):
+            index.setdefault(gram, []).append(i)
+    return index
+
+
+def _closest_match(
+    search: str,
+    names: tuple[str, ...],
+    names_lc: tuple[str, ...],
+    index: dict[str, list[int]],
+) -> Optional[str]:
+    """
+    Find the first name that contains, or is contained in, the search term.
+    
+    Any such name shares at least one trigram with the search term, so only
+    names from the matching posting lists need the substring test.
+    """
+    search_lower = search.lower()
+    grams = _trigrams(search_lower)
+    if grams:
+        candidates = sorted(set().union(*(index.get(g, ()) for g in grams)))
+    else:
+        # Too short for trigrams; fall back to a full scan
+        candidates = range(len(names))
+    
+    for i in candidates:
+        valid = names_lc[i]
+        if search_lower in valid or valid in search_lower:
+            return names[i]
+    return None
+
+
+# Lowercased names and trigram indexes for fuzzy validation, built once
+_VALID_METRICS = tuple(sorted(VALID_METRICS))
+_VALID_METRICS_LC = tuple(m.lower() for m in _VALID_METRICS)
+_METRIC_TRIGRAM_IDX = _build_trigram_index(_VALID_METRICS_LC)
+
+_VALID_DIMENSIONS = tuple(sorted(VALID_DIMENSIONS))
+_VALID_DIMENSIONS_LC = tuple(d.lower() for d in _VALID_DIMENSIONS)
+_DIMENSION_TRIGRAM_IDX = _build_trigram_index(_VALID_DIMENSIONS_LC)
+
 # Metric name mappings (common names to GA4 API names)
 METRIC_MAPPINGS = {
     "page views": "screenPageViews",
@@ -85,41 +170,301 @@ DIMENSION_MAPPINGS = {
     "event name": "eventName",
 }
 
+# Lowercased name -> API name; common-name mappings take precedence
+_METRIC_LOOKUP = {**{m.lower(): m for m in VALID_METRICS}, **METRIC_MAPPINGS}
+_DIMENSION_LOOKUP = {**{d.lower(): d for d in VALID_DIMENSIONS}, **DIMENSION_MAPPINGS}
+
+# batchRunReports accepts at most 5 reports per call; GA4 also limits
+# concurrent requests per IP, so cap in-flight batch calls
+GA4_BATCH_SIZE = 5
+GA4_MAX_CONCURRENCY = 10
+
+# GA4 data refreshes roughly hourly; repeat reports within this window are
+# served from memory. Bump the schema version when the report format changes.
+GA4_CACHE_TTL = 300
+GA4_CACHE_MAX_ENTRIES = 512
+_GA4_SCHEMA_VERSION = 1
+_GA4_CACHE: dict[str, tuple[float, GA4Report]] = {}
+# Read and written from asyncio.to_thread workers
+_GA4_CACHE_LOCK = threading.Lock()
+
+# Keywords for can_handle, compiled into one case-insensitive alternation
+ANALYTICS_KEYWORDS = (
+    "analytics", "ga4", "traffic", "visitors", "users", "sessions",
+    "page views", "pageviews", "bounce rate", "engagement",
+    "conversion", "revenue", "source", "medium", "channel",
+    "daily", "weekly", "monthly", "breakdown", "trend",
+)
+_ANALYTICS_KEYWORDS_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in ANALYTICS_KEYWORDS),
+    re.IGNORECASE,
+)
+
+# Reports up to this size go to the narrative prompt whole; larger ones
+# are summarized server-side
+SUMMARY_MAX_FULL_ROWS = 20
+TIME_DIMENSIONS = ("date", "dateHour", "dateHourMinute", "week", "month", "year")
+
+# Metrics that are averaged rather than summed across rows: GA4's float
+# type (rates, ratios) and averages reported in a unit type, such as
+# averageSessionDuration in seconds
+_MEAN_METRIC_TYPES = frozenset({"TYPE_FLOAT"})
+_MEAN_METRIC_NAME_RE = re.compile(r"^average|Rate$|Per[A-Z]")
+
+# Users asking for JSON get a JSON-mode narrative response
+_JSON_REQUEST_RE = re.compile(r"\bjson\b", re.IGNORECASE)
+
+# Numbers in a query (day counts, limits); a semantically similar cached
+# plan is only reused when they all match
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Bump when the matching system prompt changes so stale cache entries miss
+PARSE_PROMPT_VERSION = "parse-v2"
+RESPONSE_PROMPT_VERSION = "response-v2"
+
+# System prompts are module-level so the exact same prefix is sent on every
+# call, which provider-side prompt caching requires.
+PARSE_SYSTEM_PROMPT = """You are a GA4 query parser. Extract the following from user queries:
+- metrics: List of metrics to fetch (e.g., pageviews, users, sessions)
+- dimensions: List of dimensions to group by (e.g., date, page path, country)
+- date_range: Start and end dates or relative range (e.g., "last 14 days")
+- filters: Any filters mentioned (e.g., specific page paths)
+- order_by: How to sort results if mentioned
+
+Return ONLY valid JSON in this exact format:
+{
+    "metrics": ["metric1", "metric2"],
+    "dimensions": ["dimension1"],
+    "date_range": {"type": "relative", "days": 14},
+    "filters": [{"dimension": "pagePath", "value": "/pricing"}],
+    "order_by": {"field": "date", "descending": false}
+}
+
+Common mappings:
+- "page views", "views" -> "screenPageViews"
+- "users" -> "totalUsers"
+- "daily breakdown" -> dimension: "date"
+- "traffic sources" -> dimension: "sessionDefaultChannelGroup"
+- "last X days" -> date_range with days: X
+
+If information is not specified, use reasonable defaults:
+- Default date range: last 7 days
+- Default dimensions: ["date"] for time-series queries
+"""
+
+RESPONSE_SYSTEM_PROMPT = """You are a data analyst explaining GA4 analytics results.
+Given the user's question and the GA4 data, provide a clear, insightful response.
+
+Guidelines:
+- Summarize key findings first
+- Highlight trends if time-series data is present
+- Mention specific numbers and percentages
+- If data is empty or sparse, explain this gracefully
+- Keep response concise but informative
+- If the user requested JSON format, return data as JSON instead
+"""
+
+
+def report_rows(report: GA4Report, limit: Optional[int] = None) -> list[GA4Row]:
+    """Materialize up to `limit` rows of a columnar GA4 report as dicts."""
+    return _take_rows(report, slice(limit))
+
+
+def _take_rows(report: GA4Report, index) -> list[GA4Row]:
+    """Materialize the rows selected by a slice or index array as dicts."""
+    headers = report["dimension_headers"] + report["metric_headers"]
+    columns = [report["columns"][h][index].tolist() for h in headers]
+    return [dict(zip(headers, values)) for values in zip(*columns)]
+
+
+def _aggregate(column: np.ndarray, metric: str, metric_type: str) -> Union[int, float]:
+    """
+    Aggregate one metric column.
+    
+    Counts, currency and durations are summed; rates, ratios and averages
+    are averaged.
+    """
+    if metric_type in _MEAN_METRIC_TYPES or _MEAN_METRIC_NAME_RE.search(metric):
+        return round(float(column.mean()), 4)
+    if column.dtype == np.int64:
+        return int(column.sum())
+    return round(float(column.sum()), 4)
+
+
+def summarize_report(report: GA4Report, top_k: int = 5) -> dict:
+    """
+    Reduce a GA4 report to the aggregates the narrative needs.
+    
+    Small reports are included whole; larger ones are summarized as
+    per-metric aggregates, top-k rows per metric and the first and last
+    time period, so the prompt reflects all rows rather than a prefix.
+    """
+    columns = report["columns"]
+    metric_headers = report["metric_headers"]
+    metric_types = report.get("metric_types", {})
+    n_rows = len(columns[metric_headers[0]]) if metric_headers else 0
+    
+    summary = {
+        "row_count": report.get("row_count", 0),
+        "totals": report.get("totals", {}),
+    }
+    if n_rows == 0:
+        return summary
+    if n_rows <= SUMMARY_MAX_FULL_ROWS:
+        summary["rows"] = report_rows(report)
+        return summary
+    
+    summary["aggregates"] = {
+        m: _aggregate(columns[m], m, metric_types.get(m, "")) for m in metric_headers
+    }
+    
+    for metric in metric_headers:
+        top = np.argsort(columns[metric], kind="stable")[::-1][:top_k]
+        summary[f"top{top_k}_by_{metric}"] = _take_rows(report, top)
+    
+    period_dim = next(
+        (d for d in report["dimension_headers"] if d in TIME_DIMENSIONS), None
+    )
+    if period_dim:
+        periods = columns[period_dim]
+        summary["first_and_last_period"] = {
+            period: {
+                m: _aggregate(columns[m][periods == period], m, metric_types.get(m, ""))
+                for m in metric_headers
+            }
+            for period in (periods.min(), periods.max())
+        }
+    
+    return summary
+
+
+def serialize_report(report: GA4Report) -> dict:
+    """Convert a columnar GA4 report's arrays to lists for JSON output."""
+    return {
+        **report,
+        "columns": {h: column.tolist() for h, column in report["columns"].items()},
+    }
+
+
+def _fmt_date(d: datetime) -> str:
+    """Format a date as YYYY-MM-DD (cheaper than strftime)."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}"
+
+
+@functools.lru_cache(maxsize=256)
+def _build_metrics(names: tuple[str, ...]) -> tuple:
+    """Metric protos for a tuple of names, reused across requests."""
+    from google.analytics.data_v1beta.types import Metric
+    return tuple(Metric(name=name) for name in names)
+
+
+@functools.lru_cache(maxsize=256)
+def _build_dimensions(names: tuple[str, ...]) -> tuple:
+    """Dimension protos for a tuple of names, reused across requests."""
+    from google.analytics.data_v1beta.types import Dimension
+    return tuple(Dimension(name=name) for name in names)
+
+
+def _canon(plan: dict) -> str:
+    """Canonical JSON for a plan, so equal plans produce equal cache keys."""
+    return json.dumps(plan, sort_keys=True, separators=(",", ":"))
+
+
+def _ga4_cache_key(property_id: str, plan: dict) -> str:
+    payload = f"{_GA4_SCHEMA_VERSION}|{property_id}|{_canon(plan)}"
+    return hashlib.blake2b(payload.encode("utf-8")).hexdigest()
+
+
+def _ga4_cache_get(key: str) -> Optional[GA4Report]:
+    with _GA4_CACHE_LOCK:
+        entry = _GA4_CACHE.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= GA4_CACHE_TTL:
+            _GA4_CACHE.pop(key, None)
+            return None
+        return entry[1]
+
+
+def _ga4_cache_put(key: str, report: GA4Report) -> None:
+    with _GA4_CACHE_LOCK:
+        _GA4_CACHE[key] = (time.time(), report)
+
+        if len(_GA4_CACHE) > GA4_CACHE_MAX_ENTRIES:
+            now = time.time()
+            for stale in [k for k, (ts, _) in _GA4_CACHE.items() if now - ts >= GA4_CACHE_TTL]:
+                _GA4_CACHE.pop(stale, None)
+            # Still full: drop the oldest insertions
+            while len(_GA4_CACHE) > GA4_CACHE_MAX_ENTRIES:
+                _GA4_CACHE.pop(next(iter(_GA4_CACHE)), None)
+
+
+def _log_usage(stage: str, usage: LLMUsage) -> None:
+    """Log one structured line of LLM token usage for prompt-cache tuning."""
+    logger.info(orjson.dumps({
+        "agent": "analytics",
+        "stage": stage,
+        "prompt": usage.prompt_tokens,
+        "cached": usage.cached_tokens,
+        "completion": usage.completion_tokens,
+    }).decode())
+
+
+# Process-wide GA4 client, built once on first use
+_GLOBAL_CLIENT: Optional[BetaAnalyticsDataClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_ga4_client() -> BetaAnalyticsDataClient:
+    """Get or create the process-wide GA4 client using credentials from file."""
+    global _GLOBAL_CLIENT
+    
+    if _GLOBAL_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _GLOBAL_CLIENT is None:
+                from google.analytics.data_v1beta import BetaAnalyticsDataClient
+                from google.oauth2 import service_account
+                
+                credentials_path = config.ga4.credentials_path
+                logger.info(f"Loading GA4 credentials from: {credentials_path}")
+                
+                credentials = service_account.Credentials.from_service_account_file(
+                    str(credentials_path),
+                    scopes=["https://www.googleapis.com/auth/analytics.readonly"],
+                )
+                _GLOBAL_CLIENT = BetaAnalyticsDataClient(credentials=credentials)
+    
+    return _GLOBAL_CLIENT
+
 
 class AnalyticsAgent(BaseAgent):
     """Agent for handling Google Analytics 4 queries."""
     
     def __init__(self):
         super().__init__("analytics")
-        self._client: Optional[BetaAnalyticsDataClient] = None
+        self._plan_cache = LLMCache(ttl=3600, max_entries=1024)
+        self._response_cache = LLMCache(ttl=3600, max_entries=1024)
+        self._scheduler = AnalyticsBatchScheduler()
     
     def _get_client(self) -> BetaAnalyticsDataClient:
-        """Get or create the GA4 client using credentials from file."""
-        if self._client is None:
-            credentials_path = config.ga4.credentials_path
-            logger.info(f"Loading GA4 credentials from: {credentials_path}")
-            
-            credentials = service_account.Credentials.from_service_account_file(
-                str(credentials_path),
-                scopes=["https://www.googleapis.com/auth/analytics.readonly"],
-            )
-            self._client = BetaAnalyticsDataClient(credentials=credentials)
-        
-        return self._client
+        """Get the shared GA4 client."""
+        return get_ga4_client()
     
     def can_handle(self, query: str) -> bool:
         """Check if query is analytics-related."""
-        analytics_keywords = [
-            "analytics", "ga4", "traffic", "visitors", "users", "sessions",
-            "page views", "pageviews", "bounce rate", "engagement",
-            "conversion", "revenue", "source", "medium", "channel",
-            "daily", "weekly", "monthly", "breakdown", "trend",
-        ]
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in analytics_keywords)
+        return _ANALYTICS_KEYWORDS_RE.search(query) is not None
     
     async def process(self, query: str, **kwargs) -> AgentResponse:
-        """Process a GA4 analytics query."""
+        """
+        Process a GA4 analytics query.
+        
+        Queries without analytics keywords are rejected before any LLM call,
+        unless the caller passes routed=True because an upstream router has
+        already assigned the query to this agent.
+        """
+        if not kwargs.get("routed") and not self.can_handle(query):
+            return self._failure("Not an analytics query")
+        
         property_id = kwargs.get("property_id")
         
         if not property_id:
@@ -140,7 +485,7 @@ class AnalyticsAgent(BaseAgent):
             validated_plan = self._validate_plan(reporting_plan)
             
             # Step 3: Execute GA4 API request
-            ga4_response = self._execute_query(property_id, validated_plan)
+            ga4_response = await self._execute_query(property_id, validated_plan)
             
             # Step 4: Generate natural language response
             response_text = await self._generate_response(
@@ -151,7 +496,7 @@ class AnalyticsAgent(BaseAgent):
                 success=True,
                 data={
                     "reporting_plan": validated_plan,
-                    "raw_data": ga4_response,
+                    "raw_data": serialize_report(ga4_response),
                 },
                 message=response_text,
                 agent_name=self.name,
@@ -167,48 +512,125 @@ class AnalyticsAgent(BaseAgent):
                 error=str(e),
             )
     
+    async def process_batch(
+        self, queries: list[tuple[str, str]]
+    ) -> list[AgentResponse]:
+        """
+        Process several (query, property_id) pairs with batched GA4 calls.
+        
+        Args:
+            queries: Natural language questions paired with GA4 property IDs
+            
+        Returns:
+            One AgentResponse per query, in the same order
+        """
+        responses: list[Optional[AgentResponse]] = [None] * len(queries)
+        
+        # Queries without a property are rejected before any LLM call
+        parse_indices: list[int] = []
+        for i, (_, property_id) in enumerate(queries):
+            if property_id:
+                parse_indices.append(i)
+            else:
+                responses[i] = self._failure(
+                    "GA4 propertyId is required for analytics queries"
+                )
+        
+        # Parse and validate per query, so one malformed plan fails only its own query
+        plans = await asyncio.gather(
+            *(self._parse_and_validate(queries[i][0]) for i in parse_indices),
+            return_exceptions=True,
+        )
+        
+        jobs: list[tuple[str, dict]] = []
+        job_indices: list[int] = []
+        for i, plan in zip(parse_indices, plans):
+            if isinstance(plan, Exception):
+                responses[i] = self._failure(str(plan))
+            else:
+                jobs.append((queries[i][1], plan))
+                job_indices.append(i)
+        
+        reports = await self._execute_queries(jobs)
+        
+        for i, (_, plan), report in zip(job_indices, jobs, reports):
+            if isinstance(report, Exception):
+                responses[i] = self._failure(str(report))
+                continue
+            
+            query = queries[i][0]
+            try:
+                response_text = await self._generate_response(query, plan, report)
+            except Exception as e:
+                logger.exception("Error generating analytics response")
+                responses[i] = self._failure(str(e))
+                continue
+            
+            responses[i] = AgentResponse(
+                success=True,
+                data={
+                    "reporting_plan": plan,
+                    "raw_data": serialize_report(report),
+                },
+                message=response_text,
+                agent_name=self.name,
+            )
+        
+        return responses
+    
+    async def _parse_and_validate(self, query: str) -> dict:
+        """Parse a query into a reporting plan and validate it."""
+        return self._validate_plan(await self._parse_query(query))
+    
+    def _failure(self, error: str) -> AgentResponse:
+        """Build a failed AgentResponse for this agent."""
+        return AgentResponse(
+            success=False,
+            data=None,
+            message="",
+            agent_name=self.name,
+            error=error,
+        )
+    
     async def _parse_query(self, query: str) -> dict:
         """Use LLM to parse natural language query into GA4 reporting plan."""
-        system_prompt = """You are a GA4 query parser. Extract the following from user queries:
-- metrics: List of metrics to fetch (e.g., pageviews, users, sessions)
-- dimensions: List of dimensions to group by (e.g., date, page path, country)
-- date_range: Start and end dates or relative range (e.g., "last 14 days")
-- filters: Any filters mentioned (e.g., specific page paths)
-- order_by: How to sort results if mentioned
-
-Return ONLY valid JSON in this exact format:
-{
-    "metrics": ["metric1", "metric2"],
-    "dimensions": ["dimension1"],
-    "date_range": {"type": "relative", "days": 14},
-    "filters": [{"dimension": "pagePath", "value": "/pricing"}],
-    "order_by": {"field": "date", "descending": false}
-}
-
-Common mappings:
-- "page views", "views" -> "screenPageViews"
-- "users" -> "totalUsers"
-- "daily breakdown" -> dimension: "date"
-- "traffic sources" -> dimension: "sessionDefaultChannelGroup"
-- "last X days" -> date_range with days: X
-
-If information is not specified, use reasonable defaults:
-- Default date range: last 7 days
-- Default dimensions: ["date"] for time-series queries
-"""
+        normalized_query = normalize_query(query)
+        cache_key = make_key(PARSE_PROMPT_VERSION, normalized_query)
+        
+        # Exact hit first; only embed the query when that misses and the
+        # semantic cache is enabled
+        cached = self._plan_cache.check(cache_key)
+        embedding = None
+        if cached is None and config.litellm.semantic_cache:
+            # Blocking embeddings call; keep it off the event loop
+            embedding = await asyncio.to_thread(llm_client.embed, normalized_query)
+            cached = self._plan_cache.check(cache_key, embedding)
+        if cached is not None:
+            entry = orjson.loads(cached)
+            # "last 7 days" and "last 30 days" embed alike but need different plans
+            if _NUMBER_RE.findall(entry["query"]) == _NUMBER_RE.findall(normalized_query):
+                logger.debug("Using cached reporting plan")
+                return entry["plan"]
         
-        response = llm_client.structured_chat(system_prompt, query, temperature=0.1)
+        response, usage = await self._scheduler.submit(
+            "parse",
+            PARSE_SYSTEM_PROMPT,
+            query,
+            cacheable_system=True,
+            with_usage=True,
+            temperature=0.1,
+        )
+        _log_usage("parse", usage)
         
         # Extract JSON from response
-        try:
-            # Try to find JSON in the response
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+        plan = extract_json(response)
+        if isinstance(plan, dict):
+            self._plan_cache.save(
+                cache_key,
+                embedding,
+                orjson.dumps({"query": normalized_query, "plan": plan}).decode(),
+            )
+            return plan
         
         # Fallback to default plan
         logger.warning("Could not parse LLM response, using defaults")
@@ -230,18 +652,12 @@ If information is not specified, use reasonable defaults:
             "order_by": plan.get("order_by"),
         }
         
-        # Validate metrics
+        # Validate metrics: exact/common name first, then closest match
         for metric in plan.get("metrics", []):
-            metric_lower = metric.lower()
-            
-            # Check if it's a common name that needs mapping
-            if metric_lower in METRIC_MAPPINGS:
-                api_metric = METRIC_MAPPINGS[metric_lower]
-            elif metric in VALID_METRICS:
-                api_metric = metric
-            else:
-                # Try to find closest match
-                api_metric = self._find_closest_metric(metric)
+            api_metric = (
+                _METRIC_LOOKUP.get(metric.lower())
+                or self._find_closest_metric(metric)
+            )
             
             if api_metric and api_metric not in validated["metrics"]:
                 validated["metrics"].append(api_metric)
@@ -252,68 +668,145 @@ If information is not specified, use reasonable defaults:
         
         # Validate dimensions
         for dimension in plan.get("dimensions", []):
-            dim_lower = dimension.lower()
-            
-            if dim_lower in DIMENSION_MAPPINGS:
-                api_dim = DIMENSION_MAPPINGS[dim_lower]
-            elif dimension in VALID_DIMENSIONS:
-                api_dim = dimension
-            else:
-                api_dim = self._find_closest_dimension(dimension)
+            api_dim = (
+                _DIMENSION_LOOKUP.get(dimension.lower())
+                or self._find_closest_dimension(dimension)
+            )
             
             if api_dim and api_dim not in validated["dimensions"]:
                 validated["dimensions"].append(api_dim)
         
-        # Validate filters
+        # Validate filters, normalizing the dimension to its API name
         for filter_item in plan.get("filters", []):
-            dim = filter_item.get("dimension", "")
-            if dim in VALID_DIMENSIONS or dim.lower() in DIMENSION_MAPPINGS:
-                validated["filters"].append(filter_item)
+            api_dim = _DIMENSION_LOOKUP.get(filter_item.get("dimension", "").lower())
+            if api_dim:
+                validated["filters"].append({**filter_item, "dimension": api_dim})
         
         return validated
     
     def _find_closest_metric(self, metric: str) -> Optional[str]:
         """Find closest matching valid metric."""
-        metric_lower = metric.lower()
-        for valid in VALID_METRICS:
-            if metric_lower in valid.lower() or valid.lower() in metric_lower:
-                return valid
-        return None
+        return _closest_match(
+            metric, _VALID_METRICS, _VALID_METRICS_LC, _METRIC_TRIGRAM_IDX
+        )
     
     def _find_closest_dimension(self, dimension: str) -> Optional[str]:
         """Find closest matching valid dimension."""
-        dim_lower = dimension.lower()
-        for valid in VALID_DIMENSIONS:
-            if dim_lower in valid.lower() or valid.lower() in dim_lower:
-                return valid
-        return None
+        return _closest_match(
+            dimension, _VALID_DIMENSIONS, _VALID_DIMENSIONS_LC, _DIMENSION_TRIGRAM_IDX
+        )
     
-    def _execute_query(self, property_id: str, plan: dict) -> dict:
-        """Execute the GA4 API query."""
+    async def _execute_query(self, property_id: str, plan: dict) -> GA4Report:
+        """Execute the GA4 API query in a worker thread."""
+        reports = await asyncio.to_thread(self._run_batch, property_id, [plan])
+        return reports[0]
+    
+    async def _execute_queries(
+        self, jobs: list[tuple[str, dict]]
+    ) -> list[Union[GA4Report, Exception]]:
+        """
+        Execute many (property_id, plan) jobs with batched GA4 calls.
+        
+        Jobs for the same property are packed GA4_BATCH_SIZE at a time into
+        one batchRunReports call, and calls run concurrently under a cap to
+        stay within GA4's per-IP rate limits.
+        
+        Returns:
+            One result per job, in order; a failed batch yields its exception
+            for each of its jobs
+        """
+        by_property: dict[str, list[int]] = {}
+        for i, (property_id, _) in enumerate(jobs):
+            by_property.setdefault(property_id, []).append(i)
+        
+        results: list[Union[GA4Report, Exception]] = [None] * len(jobs)
+        semaphore = asyncio.Semaphore(GA4_MAX_CONCURRENCY)
+        
+        async def run(property_id: str, indices: list[int]) -> None:
+            plans = [jobs[i][1] for i in indices]
+            async with semaphore:
+                try:
+                    reports = await asyncio.to_thread(
+                        self._run_batch, property_id, plans
+                    )
+                except Exception as e:
+                    logger.error(f"GA4 batch for property {property_id} failed: {e}")
+                    reports = [e] * len(indices)
+            for i, report in zip(indices, reports):
+                results[i] = report
+        
+        await asyncio.gather(*(
+            run(property_id, indices[k:k + GA4_BATCH_SIZE])
+            for property_id, indices in by_property.items()
+            for k in range(0, len(indices), GA4_BATCH_SIZE)
+        ))
+        return results
+    
+    def _run_batch(self, property_id: str, plans: list[dict]) -> list[GA4Report]:
+        """
+        Run up to GA4_BATCH_SIZE plans against one property in a single call.
+        
+        Reports fetched within the last GA4_CACHE_TTL seconds are served
+        from the cache; only the remaining plans are sent to GA4.
+        """
+        keys = [_ga4_cache_key(property_id, plan) for plan in plans]
+        results = [_ga4_cache_get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            logger.debug(f"Using cached GA4 report(s) for property {property_id}")
+            return results
+        
+        from google.analytics.data_v1beta.types import BatchRunReportsRequest
+        
         client = self._get_client()
         
+        built = [self._build_request(plans[i]) for i in missing]
+        request = BatchRunReportsRequest(
+            property=f"properties/{property_id}",
+            requests=[report_request for report_request, _, _ in built],
+        )
+        response = client.batch_run_reports(request)
+        
+        for i, report, (_, start_str, end_str) in zip(
+            missing, response.reports, built
+        ):
+            results[i] = self._parse_report(report, plans[i], start_str, end_str)
+            _ga4_cache_put(keys[i], results[i])
+        
+        return results
+    
+    def _build_request(
+        self, plan: dict
+    ) -> tuple[RunReportRequest, str, str]:
+        """Build a RunReportRequest (without property) for a validated plan."""
+        from google.analytics.data_v1beta.types import (
+            RunReportRequest,
+            DateRange,
+            FilterExpression,
+            Filter,
+        )
+        
         # Build date range
         date_range_config = plan.get("date_range", {})
         if date_range_config.get("type") == "relative":
             days = date_range_config.get("days", 7)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            now = datetime.now()
+            end_str = _fmt_date(now)
+            start_str = _fmt_date(now - timedelta(days=days))
         else:
-            start_date = datetime.fromisoformat(date_range_config.get("start", ""))
-            end_date = datetime.fromisoformat(date_range_config.get("end", ""))
+            start_str = _fmt_date(datetime.fromisoformat(date_range_config.get("start", "")))
+            end_str = _fmt_date(datetime.fromisoformat(date_range_config.get("end", "")))
         
         date_ranges = [
             DateRange(
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=end_date.strftime("%Y-%m-%d"),
+                start_date=start_str,
+                end_date=end_str,
             )
         ]
         
-        # Build metrics
-        metrics = [Metric(name=m) for m in plan.get("metrics", [])]
-        
-        # Build dimensions
-        dimensions = [Dimension(name=d) for d in plan.get("dimensions", [])]
+        # Build metrics and dimensions (cached per name tuple)
+        metrics = list(_build_metrics(tuple(plan.get("metrics", []))))
+        dimensions = list(_build_dimensions(tuple(plan.get("dimensions", []))))
         
         # Build filters if any
         dimension_filter = None
@@ -333,9 +826,7 @@ If information is not specified, use reasonable defaults:
                 )
             )
         
-        # Build request
         request = RunReportRequest(
-            property=f"properties/{property_id}",
             date_ranges=date_ranges,
             metrics=metrics,
             dimensions=dimensions if dimensions else None,
@@ -343,63 +834,77 @@ If information is not specified, use reasonable defaults:
             limit=1000,
         )
         
-        # Execute request
-        response = client.run_report(request)
+        return request, start_str, end_str
+    
+    def _parse_report(
+        self,
+        response: RunReportResponse,
+        plan: dict,
+        start_str: str,
+        end_str: str,
+    ) -> GA4Report:
+        """Convert a GA4 report into the structured result dict."""
+        from google.analytics.data_v1beta.types import MetricType
+        
+        dim_headers = [h.name for h in response.dimension_headers]
+        metric_headers = [h.name for h in response.metric_headers]
+        metric_types = [
+            int if h.type_ == MetricType.TYPE_INTEGER else float
+            for h in response.metric_headers
+        ]
+        
+        # Fill one preallocated array per column instead of a dict per row
+        n_rows = len(response.rows)
+        dim_columns = [np.empty(n_rows, dtype=object) for _ in dim_headers]
+        metric_columns = [
+            np.empty(n_rows, dtype=np.int64 if t is int else np.float64)
+            for t in metric_types
+        ]
         
-        # Parse response into structured data
-        result = {
-            "rows": [],
+        for i, row in enumerate(response.rows):
+            for j, dim_value in enumerate(row.dimension_values):
+                dim_columns[j][i] = dim_value.value
+            for j, metric_value in enumerate(row.metric_values):
+                metric_columns[j][i] = metric_types[j](metric_value.value)
+        
+        result: GA4Report = {
+            "columns": dict(zip(dim_headers + metric_headers, dim_columns + metric_columns)),
+            "dimension_headers": dim_headers,
+            "metric_headers": metric_headers,
+            "metric_types": {h.name: MetricType(h.type_).name for h in response.metric_headers},
             "totals": {},
             "row_count": response.row_count,
             "metadata": {
                 "metrics": plan.get("metrics", []),
                 "dimensions": plan.get("dimensions", []),
                 "date_range": {
-                    "start": start_date.strftime("%Y-%m-%d"),
-                    "end": end_date.strftime("%Y-%m-%d"),
+                    "start": start_str,
+                    "end": end_str,
                 },
             },
         }
         
-        # Extract dimension and metric headers
-        dim_headers = [h.name for h in response.dimension_headers]
-        metric_headers = [h.name for h in response.metric_headers]
-        
-        # Extract rows
-        for row in response.rows:
-            row_data = {}
-            
-            for i, dim_value in enumerate(row.dimension_values):
-                row_data[dim_headers[i]] = dim_value.value
-            
-            for i, metric_value in enumerate(row.metric_values):
-                row_data[metric_headers[i]] = metric_value.value
-            
-            result["rows"].append(row_data)
-        
         # Extract totals if available
         if response.totals:
             for total_row in response.totals:
                 for i, metric_value in enumerate(total_row.metric_values):
-                    result["totals"][metric_headers[i]] = metric_value.value
+                    result["totals"][metric_headers[i]] = metric_types[i](metric_value.value)
         
         return result
     
     async def _generate_response(
-        self, original_query: str, plan: dict, ga4_data: dict
+        self, original_query: str, plan: dict, ga4_data: GA4Report
     ) -> str:
         """Generate natural language response from GA4 data."""
-        system_prompt = """You are a data analyst explaining GA4 analytics results.
-Given the user's question and the GA4 data, provide a clear, insightful response.
-
-Guidelines:
-- Summarize key findings first
-- Highlight trends if time-series data is present
-- Mention specific numbers and percentages
-- If data is empty or sparse, explain this gracefully
-- Keep response concise but informative
-- If the user requested JSON format, return data as JSON instead
-"""
+        rows_digest = make_key(
+            serialize_report(ga4_data)["columns"],
+            ga4_data.get("totals", {}),
+        )
+        cache_key = make_key(RESPONSE_PROMPT_VERSION, original_query, plan, rows_digest)
+        cached = self._response_cache.check(cache_key)
+        if cached is not None:
+            logger.debug("Using cached analytics response")
+            return cached
         
         context = f"""
 User Question: {original_query}
@@ -410,10 +915,22 @@ Query Plan:
 - Date Range: {plan.get('date_range', {})}
 - Filters: {plan.get('filters', [])}
 
-GA4 Results:
-- Total Rows: {ga4_data.get('row_count', 0)}
-- Data: {json.dumps(ga4_data.get('rows', [])[:20], indent=2)}
-- Totals: {json.dumps(ga4_data.get('totals', {}), indent=2)}
+GA4 Results (summarized):
+{orjson.dumps(summarize_report(ga4_data)).decode()}
 """
         
-        return llm_client.structured_chat(system_prompt, context)
+        chat_kwargs = {}
+        if _JSON_REQUEST_RE.search(original_query):
+            chat_kwargs["response_format"] = {"type": "json_object"}
+        
+        response, usage = await self._scheduler.submit(
+            "response",
+            RESPONSE_SYSTEM_PROMPT,
+            context,
+            cacheable_system=True,
+            with_usage=True,
+            **chat_kwargs,
+        )
+        _log_usage("response", usage)
+        self._response_cache.save(cache_key, None, response)
+        return response
@@ -0,0 +1,125 @@
+"""
+Prefix-grouped dispatch of analytics LLM calls.
+Calls that share a system prompt are grouped; for prompts long enough to
+be cached by the provider, the first call of a group warms the KV/prompt
+cache and the rest follow once it is done.
+"""
+import asyncio
+import hashlib
+import logging
+import itertools
+from typing import Optional, Union
+
+from src.utils import llm_client, LLMUsage
+from src.utils.llm_client import CACHE_PREFIX_MIN_CHARS
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsBatchScheduler:
+    """
+    Collects LLM calls over a short window and dispatches them grouped by
+    (call kind, system prompt hash).
+
+    Groups run concurrently. When the shared system prompt is at least
+    CACHE_PREFIX_MIN_CHARS long, the first call of a group is sent alone
+    and the others are released together when it finishes, so they hit
+    the prefix it cached instead of racing it; shorter prompts aren't
+    cached by providers, so their groups are sent all at once. Each call
+    waits at most one window (default 50ms) before its group starts.
+    """
+
+    def __init__(self, window: float = 0.05):
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatched: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        kind: str,
+        system_prompt: str,
+        user_message: str,
+        **kwargs,
+    ) -> Union[str, tuple[str, LLMUsage]]:
+        """
+        Queue an LLM call and wait for its response.
+
+        Args:
+            kind: Call type used for grouping (e.g. "parse", "response")
+            system_prompt: The system instruction
+            user_message: The user's query
+            **kwargs: Additional arguments passed to the LLM client
+
+        Returns:
+            The LLM client's structured_chat() result
+        """
+        self._ensure_worker()
+
+        system_hash = hashlib.blake2b(
+            system_prompt.encode("utf-8"), digest_size=16
+        ).hexdigest()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(
+            (kind, system_hash, (system_prompt, user_message, kwargs), future)
+        )
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Start the drain worker on the running loop if it isn't running there."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # A queue and task belong to the loop that created them
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._dispatched = set()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Drain the queue in windows and dispatch each window grouped by prefix."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch.sort(key=lambda item: (item[0], item[1]))
+            logger.debug("Dispatching %d analytics LLM call(s)", len(batch))
+
+            for _, group in itertools.groupby(batch, key=lambda item: (item[0], item[1])):
+                calls = [(payload, future) for _, _, payload, future in group]
+                task = asyncio.create_task(self._dispatch_group(calls))
+                self._dispatched.add(task)
+                task.add_done_callback(self._dispatched.discard)
+
+    async def _dispatch_group(self, calls: list[tuple[tuple, asyncio.Future]]) -> None:
+        """Send a prefix group, warming the prompt cache first if it is cacheable."""
+        system_prompt = calls[0][0][0]
+        if len(calls) > 1 and len(system_prompt) >= CACHE_PREFIX_MIN_CHARS:
+            await self._dispatch(*calls[0])
+            calls = calls[1:]
+        await asyncio.gather(*(self._dispatch(payload, future) for payload, future in calls))
+
+    async def _dispatch(self, payload: tuple, future: asyncio.Future) -> None:
+        """Send one call and resolve its caller's future."""
+        system_prompt, user_message, kwargs = payload
+        try:
+            result = await llm_client.coalesced_chat(
+                system_prompt, user_message, **kwargs
+            )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Any, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResponse:
     """Standard response from an agent."""
     success: bool
@@ -1,18 +1,223 @@
-import json
+import os
+import re
+import time
+import asyncio
 import logging
-from typing import Optional
+from itertools import zip_longest
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+from urllib.parse import quote
+
+import aiohttp
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+if TYPE_CHECKING:
+    from google.oauth2 import service_account
 
 from .base import BaseAgent, AgentResponse
 from src.config import config
-from src.utils import llm_client
-
-import time
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from src.utils import llm_client, dumps, extract_json
 
 logger = logging.getLogger(__name__)
 
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+SHEET_RANGE = "Sheet1!A1:ZZ"  # Get all columns
+SHEET_DTYPE = "string[pyarrow]"
+
+SEO_KEYWORDS = (
+    "seo", "url", "urls", "title tag", "meta description",
+    "https", "http", "indexable", "indexability", "crawl",
+    "screaming frog", "audit", "404", "redirect", "canonical",
+    "h1", "heading", "content", "word count", "duplicate",
+    "robots", "sitemap", "status code",
+)
+_SEO_KEYWORDS_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in SEO_KEYWORDS),
+    re.IGNORECASE,
+)
+
+# Formatted with the sheet's columns once per cache refresh
+PARSE_SYSTEM_PROMPT_TEMPLATE = """You are an SEO data analyst. Parse the user's query to determine what analysis to perform.
+
+Available columns in the data: {columns}
+
+Common column mappings:
+- URL, Address -> the page URL
+- Title, Title 1 -> title tag
+- Meta Description, Meta Description 1 -> meta description
+- Status Code -> HTTP status
+- Indexability -> whether page is indexable
+- Content Type -> page content type
+- Word Count -> content length
+
+Return ONLY valid JSON in this format:
+{{
+    "operation": "filter|group|aggregate|count|list",
+    "filters": [
+        {{"column": "column_name", "operator: equals|contains|not_contains|greater|less|not_equals|is_empty|not_empty", "value": "value"}}
+    ],
+    "group_by": "column_name or null",
+    "aggregation": "count|sum|mean|null",
+    "select_columns": ["col1", "col2"],
+    "limit": 100,
+    "return_json": false
+}}
+
+Examples:
+- "URLs without HTTPS" -> filter where URL not contains "https"
+- "Group by indexability" -> group_by: "Indexability", aggregation: "count"
+- "Title tags longer than 60 chars" -> filter where title length > 60
+- "Return in JSON format" -> return_json: true
+"""
+
+# Fallback aliases for column searches: search term -> column name fragments
+COLUMN_MAPPINGS = {
+    "url": ["address", "url"],
+    "title": ["title 1", "title", "title tag"],
+    "meta description": ["meta description 1", "meta description"],
+    "status": ["status code"],
+    "indexability": ["indexability", "indexable"],
+    "content": ["content type"],
+    "word count": ["word count"],
+    "h1": ["h1-1", "h1"],
+}
+
+# Deterministic plans for the common query shapes; anything else goes to the LLM
+_NO_HTTPS_RE = re.compile(
+    r"\b(?:without|(?:do(?:es)?\s+)?not\s+(?:use|using|on)|missing|non-?)\s*https\b"
+)
+# The group-by column runs to the end of the query or a punctuation mark,
+# so trailing conditions are never absorbed into the column name
+_GROUP_BY_RE = re.compile(
+    r"\bgroup(?:ed)?\s+(?:all\s+)?(?:the\s+)?(?:them\s+|urls\s+|pages\s+)?by\s+([a-z0-9][a-z0-9 _-]*?)"
+    r"\s*(?=$|[,.;:?!])"
+)
+_LENGTH_RE = re.compile(
+    r"\b(title|meta description|h1)s?(?:\s+tags?)?\s+(?:(?:that|which)\s+)?(?:are\s+)?"
+    r"(longer\s+than|shorter\s+than|more\s+than|less\s+than|fewer\s+than|over|under)"
+    r"\s+(\d+)(?:\s+char(?:acter)?s)?"
+)
+_LONGER_WORDS = ("longer", "more", "over")
+# Words that may remain once the patterns are removed without changing the plan
+_RULE_FILLER = frozenset(
+    "a all and any are by can characters chars do does find for format from give "
+    "in is json list me of on page pages please return show tag tags that the "
+    "them these those to url urls using what which with".split()
+)
+
+
+def _sheet_to_frame(values: list[list[str]]) -> pd.DataFrame:
+    """
+    Build the SEO frame from Sheets rows via Arrow columns.
+    
+    Args:
+        values: Sheets API rows, the first holding the headers
+        
+    Returns:
+        Frame with stripped column names and string[pyarrow] columns
+    """
+    headers = [str(header).strip() for header in values[0]]
+    
+    # Transpose in C; Sheets omits trailing empty cells, so short rows are
+    # padded with ""
+    columns = list(zip_longest(*values[1:], fillvalue=""))[:len(headers)]
+    columns += [()] * (len(headers) - len(columns))
+    num_rows = len(values) - 1
+    
+    table = pa.Table.from_arrays(
+        [
+            pa.array(column or [""] * num_rows, type=pa.large_string())
+            for column in columns
+        ],
+        names=headers,
+    )
+    return table.to_pandas(types_mapper={pa.large_string(): pd.StringDtype("pyarrow")}.get)
+
+
+def _length_mask(series: pd.Series, operator: str, threshold: float) -> np.ndarray:
+    """
+    Compare string lengths against a threshold in one Arrow compute pass.
+    
+    Args:
+        series: String column to measure
+        operator: "greater" or "less" (also the Arrow compute function name)
+        threshold: Length to compare against
+        
+    Returns:
+        Boolean mask; missing cells never match
+    """
+    lengths = pc.utf8_length(pa.array(series, type=pa.large_string()))
+    matches = pc.call_function(operator, [lengths, threshold]).fill_null(False)
+    return matches.to_numpy(zero_copy_only=False)
+
+
+def _blank_mask(series: pd.Series) -> np.ndarray:
+    """Missing or whitespace-only cells, found in one Arrow regex pass."""
+    blank = pc.match_substring_regex(pa.array(series, type=pa.large_string()), r"^\s*$")
+    return blank.fill_null(True).to_numpy(zero_copy_only=False)
+
+
+class _ColumnLookup:
+    """Column name matching over one sheet's headers, built once per load."""
+    
+    def __init__(self, columns: Sequence[str]):
+        self._lowered = [(col.lower(), col) for col in columns]
+        self._exact: dict[str, str] = {}
+        for lower, col in self._lowered:
+            self._exact.setdefault(lower, col)
+        
+        # Resolve each alias group against the headers up front
+        self._aliases: dict[str, Optional[str]] = {
+            key: next(
+                (
+                    col
+                    for alt in alternatives
+                    for lower, col in self._lowered
+                    if alt in lower
+                ),
+                None,
+            )
+            for key, alternatives in COLUMN_MAPPINGS.items()
+        }
+        self._memo: dict[str, Optional[str]] = {}
+    
+    def exact(self, search: str) -> Optional[str]:
+        """The column whose name equals search, ignoring case."""
+        return self._exact.get(search.lower().strip())
+    
+    def find(self, search: str) -> Optional[str]:
+        """Exact match, then partial match, then common mappings."""
+        search_lower = search.lower().strip()
+        if search_lower in self._memo:
+            return self._memo[search_lower]
+        
+        match = self._exact.get(search_lower)
+        if match is None:
+            match = next(
+                (
+                    col
+                    for lower, col in self._lowered
+                    if search_lower in lower or lower in search_lower
+                ),
+                None,
+            )
+        if match is None:
+            match = next(
+                (
+                    col
+                    for key, col in self._aliases.items()
+                    if col is not None and (search_lower in key or key in search_lower)
+                ),
+                None,
+            )
+        
+        self._memo[search_lower] = match
+        return match
+
 
 class SEOAgent(BaseAgent):
     """Agent for handling SEO audit queries from Screaming Frog data."""
@@ -22,18 +227,32 @@ class SEOAgent(BaseAgent):
         self._data_cache: Optional[pd.DataFrame] = None
         self._cache_timestamp: Optional[float] = None
         self._cache_ttl = 300  # 5 minutes cache
+        # Lowercased string form of each column of the cached frame, filled
+        # on first use and dropped whenever the cache is refreshed
+        self._lowered_cache: dict[str, pd.Series] = {}
+        self._column_lookup: Optional[_ColumnLookup] = None
+        # Per-refresh values reused by every query against the cached frame
+        self._columns: list[str] = []
+        self._row_count = 0
+        self._parse_prompt = ""
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._credentials: Optional["service_account.Credentials"] = None
+        self._token_lock = asyncio.Lock()
+        self._refresh_lock = asyncio.Lock()
+        
+        # Start warm from the last snapshot written by any worker
+        self._load_snapshot()
+        
+        # Parse the service account key once; a missing key file is retried
+        # on first fetch so the app can still start without it
+        try:
+            self._credentials = self._load_credentials()
+        except Exception as e:
+            logger.warning(f"Could not load SEO credentials: {e}")
     
     def can_handle(self, query: str) -> bool:
         """Check if query is SEO-related."""
-        seo_keywords = [
-            "seo", "url", "urls", "title tag", "meta description",
-            "https", "http", "indexable", "indexability", "crawl",
-            "screaming frog", "audit", "404", "redirect", "canonical",
-            "h1", "heading", "content", "word count", "duplicate",
-            "robots", "sitemap", "status code",
-        ]
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in seo_keywords)
+        return _SEO_KEYWORDS_RE.search(query) is not None
     
     async def process(self, query: str, **kwargs) -> AgentResponse:
         """Process an SEO-related query."""
@@ -51,7 +270,9 @@ class SEOAgent(BaseAgent):
                 )
             
             # Step 2: Parse query to understand the analysis needed
-            analysis_plan = await self._parse_query(query, df.columns.tolist())
+            analysis_plan = self._rule_based_plan(query, df)
+            if analysis_plan is None:
+                analysis_plan = await self._parse_query(query, self._parse_prompt)
             logger.info(f"SEO analysis plan: {analysis_plan}")
             
             # Step 3: Execute the analysis
@@ -59,7 +280,7 @@ class SEOAgent(BaseAgent):
             
             # Step 4: Generate natural language response
             response_text = await self._generate_response(
-                query, analysis_plan, result_data, df.shape[0]
+                query, analysis_plan, result_data, self._row_count
             )
             
             return AgentResponse(
@@ -67,7 +288,7 @@ class SEOAgent(BaseAgent):
                 data={
                     "analysis_plan": analysis_plan,
                     "result_data": result_data,
-                    "total_urls": df.shape[0],
+                    "total_urls": self._row_count,
                 },
                 message=response_text,
                 agent_name=self.name,
@@ -85,38 +306,43 @@ class SEOAgent(BaseAgent):
     
     async def _load_data(self) -> Optional[pd.DataFrame]:
         """Load SEO data from Google Sheets."""
-        import time
-        
         # Check cache
-        current_time = time.time()
-        if (
-            self._data_cache is not None
-            and self._cache_timestamp
-            and (current_time - self._cache_timestamp) < self._cache_ttl
-        ):
+        if self._cache_is_fresh():
             logger.debug("Using cached SEO data")
             return self._data_cache
         
+        # Single-flight refresh: one coroutine refetches, the rest wait and
+        # reuse its result
+        async with self._refresh_lock:
+            if self._cache_is_fresh():
+                logger.debug("Using SEO data refreshed by a concurrent request")
+                return self._data_cache
+            
+            return await self._fetch_data()
+    
+    def _cache_is_fresh(self) -> bool:
+        return (
+            self._data_cache is not None
+            and self._cache_timestamp is not None
+            and (time.time() - self._cache_timestamp) < self._cache_ttl
+        )
+    
+    async def _fetch_data(self) -> Optional[pd.DataFrame]:
+        """Fetch the sheet and rebuild the cached DataFrame."""
+        current_time = time.time()
         try:
             spreadsheet_id = config.seo.spreadsheet_id
+            token = await self._get_access_token()
             
-
-            logger.info(f"Using SEO credentials at: {config.seo.credentials_path}")
-        
-            # Use service account credentials
-            credentials = service_account.Credentials.from_service_account_file(
-                str(config.seo.credentials_path),
-                scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-            )
-            
-            # Build the Sheets API service
-            service = build('sheets', 'v4', credentials=credentials)
-            
-            # Get all data from the first sheet
-            result = service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range='Sheet1!A1:ZZ'  # Get all columns
-            ).execute()
+            # Call the Sheets v4 REST API directly so the fetch doesn't block
+            # the event loop
+            url = f"{SHEETS_API_URL}/{spreadsheet_id}/values/{quote(SHEET_RANGE)}"
+            session = self._get_session()
+            async with session.get(
+                url, headers={"Authorization": f"Bearer {token}"}
+            ) as response:
+                response.raise_for_status()
+                result = orjson.loads(await response.read())
             
             values = result.get('values', [])
 
@@ -128,17 +354,11 @@ class SEOAgent(BaseAgent):
                 return None
             
             # Convert to DataFrame (first row as headers)
-            headers = values[0]
-            data = values[1:]
-
-            df = pd.DataFrame(data, columns=headers)
-
-            # Clean column names
-            df.columns = df.columns.str.strip()
+            df = _sheet_to_frame(values)
             
             # Cache the data
-            self._data_cache = df
-            self._cache_timestamp = current_time
+            self._set_cache(df, current_time)
+            await asyncio.to_thread(self._write_snapshot, df)
             
             logger.info(f"Loaded {len(df)} rows with columns: {df.columns.tolist()}")
             return df
@@ -146,51 +366,150 @@ class SEOAgent(BaseAgent):
         except Exception as e:
             logger.error(f"Failed to load SEO data: {e}")
             return None
+    
+    def _set_cache(self, df: pd.DataFrame, timestamp: float) -> None:
+        """Swap in a new cached frame and reset the state derived from it."""
+        self._data_cache = df
+        self._lowered_cache = {}
+        self._column_lookup = _ColumnLookup(df.columns)
+        self._columns = df.columns.tolist()
+        self._row_count = len(df)
+        self._parse_prompt = PARSE_SYSTEM_PROMPT_TEMPLATE.format(columns=self._columns)
+        self._cache_timestamp = timestamp
+    
+    def _snapshot_path(self) -> Path:
+        return config.seo.cache_dir / f"seo_cache_{config.seo.spreadsheet_id}.parquet"
+    
+    def _load_snapshot(self) -> None:
+        """Hydrate the cache from the parquet snapshot if it is within the TTL."""
+        path = self._snapshot_path()
+        try:
+            mtime = path.stat().st_mtime
+            if (time.time() - mtime) >= self._cache_ttl:
+                return
+            df = pd.read_parquet(path, engine="pyarrow")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable SEO data snapshot {path}: {e}")
+            return
+        
+        self._set_cache(df, mtime)
+        logger.info(f"Loaded {len(df)} rows from SEO data snapshot {path}")
+    
+    def _write_snapshot(self, df: pd.DataFrame) -> None:
+        """Persist the frame to parquet (written to a temp file, then swapped in)."""
+        path = self._snapshot_path()
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(tmp_path, engine="pyarrow", index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write SEO data snapshot {path}: {e}")
+    
+    async def _get_access_token(self) -> str:
+        """Return a valid Sheets access token, refreshing it once expired."""
+        async with self._token_lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+            
+            if not self._credentials.valid:
+                from google.auth.transport.requests import Request as AuthRequest
+                
+                # The OAuth token exchange is a blocking HTTP call
+                await asyncio.to_thread(self._credentials.refresh, AuthRequest())
+            
+            return self._credentials.token
+    
+    @staticmethod
+    def _load_credentials() -> "service_account.Credentials":
+        from google.oauth2 import service_account
+        
+        logger.info(f"Using SEO credentials at: {config.seo.credentials_path}")
+        return service_account.Credentials.from_service_account_file(
+            config.seo.credentials_path,
+            scopes=['https://www.googleapis.com/auth/spreadsheets.readonly'],
+        )
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the HTTP session (created lazily on the running loop)."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
 
-    async def _parse_query(self, query: str, columns: list) -> dict:
-        """Use LLM to parse the SEO query into an analysis plan."""
-        system_prompt = f"""You are an SEO data analyst. Parse the user's query to determine what analysis to perform.
-
-Available columns in the data: {columns}
-
-Common column mappings:
-- URL, Address -> the page URL
-- Title, Title 1 -> title tag
-- Meta Description, Meta Description 1 -> meta description
-- Status Code -> HTTP status
-- Indexability -> whether page is indexable
-- Content Type -> page content type
-- Word Count -> content length
-
-Return ONLY valid JSON in this format:
-{{
-    "operation": "filter|group|aggregate|count|list",
-    "filters": [
-        {{"column": "column_name", "operator: equals|contains|not_contains|greater|less|not_equals|is_empty|not_empty", "value": "value"}}
-    ],
-    "group_by": "column_name or null",
-    "aggregation": "count|sum|mean|null",
-    "select_columns": ["col1", "col2"],
-    "limit": 100,
-    "return_json": false
-}}
-
-Examples:
-- "URLs without HTTPS" -> filter where URL not contains "https"
-- "Group by indexability" -> group_by: "Indexability", aggregation: "count"
-- "Title tags longer than 60 chars" -> filter where title length > 60
-- "Return in JSON format" -> return_json: true
-"""
+    def _rule_based_plan(self, query: str, df: pd.DataFrame) -> Optional[dict]:
+        """
+        Build an analysis plan without the LLM for recognized query shapes.
         
-        response = llm_client.structured_chat(system_prompt, query, temperature=0.1)
+        Handles non-HTTPS URLs, "group by <column>" and
+        "<title|meta description|h1> longer/shorter than N".
         
-        try:
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                return json.loads(response[json_start:json_end])
-        except json.JSONDecodeError:
-            pass
+        Args:
+            query: The user's query
+            df: The loaded SEO data
+            
+        Returns:
+            The plan, or None if any part of the query isn't recognized
+        """
+        text = query.lower()
+        filters = []
+        group_by = None
+        
+        if _NO_HTTPS_RE.search(text):
+            filters.append({"column": "url", "operator": "not_contains", "value": "https"})
+            text = _NO_HTTPS_RE.sub(" ", text)
+        
+        match = _LENGTH_RE.search(text)
+        if match:
+            subject, comparison, threshold = match.groups()
+            operator = "greater" if comparison.startswith(_LONGER_WORDS) else "less"
+            filters.append(
+                {"column": f"{subject} length", "operator": operator, "value": threshold}
+            )
+            text = text[:match.start()] + " " + text[match.end():]
+        
+        match = _GROUP_BY_RE.search(text)
+        if match:
+            # Only an exact column name is trusted; anything looser goes to
+            # the LLM rather than risk grouping by the wrong column
+            group_by = self._column_lookup_for(df).exact(match.group(1))
+            if group_by is None:
+                return None
+            text = text[:match.start()] + " " + text[match.end():]
+        
+        if not filters and group_by is None:
+            return None
+        
+        # Bail out if the query says anything the patterns didn't consume
+        if any(word not in _RULE_FILLER for word in re.findall(r"[a-z0-9]+", text)):
+            return None
+        
+        return {
+            "operation": "group" if group_by else "filter",
+            "filters": filters,
+            "group_by": group_by,
+            "aggregation": "count" if group_by else None,
+            "select_columns": [],
+            "limit": 100,
+            "return_json": "json" in query.lower(),
+            "source": "rules",
+        }
+    
+    async def _parse_query(self, query: str, system_prompt: str) -> dict:
+        """Use LLM to parse the SEO query into an analysis plan."""
+        response = await llm_client.coalesced_chat(system_prompt, query, temperature=0.1)
+        
+        plan = extract_json(response)
+        if isinstance(plan, dict):
+            return plan
         
         # Fallback default
         return {
@@ -204,8 +523,15 @@ Examples:
         }
     
     def _execute_analysis(self, df: pd.DataFrame, plan: dict) -> dict:
-        """Execute the SEO analysis based on the plan."""
-        result_df = df.copy()
+        """
+        Execute the SEO analysis based on the plan.
+        
+        For list results, total_matching counts every row that matches the
+        filters, before the plan's limit is applied; data holds at most
+        limit of those rows.
+        """
+        # Fuse all filters into one boolean mask and slice the frame once
+        mask = np.ones(len(df), dtype=bool)
         
         # Apply filters
         for filter_item in plan.get("filters", []):
@@ -213,75 +539,65 @@ Examples:
             if column is None:
                 continue
             
-            operator = filter_item.get("operator", "equals")
+            operator = filter_item.get("operator") or "equals"
             value = filter_item.get("value", "")
+            series = df[column]
             
             if operator == "equals":
-                result_df = result_df[result_df[column] == value]
+                m = series == value
             elif operator == "not_equals":
-                result_df = result_df[result_df[column] != value]
+                m = series != value
             elif operator == "contains":
-                result_df = result_df[
-                    result_df[column].astype(str).str.contains(value, case=False, na=False)
-                ]
+                m = self._lowered(df, column).str.contains(str(value).lower(), regex=False)
             elif operator == "not_contains":
-                result_df = result_df[
-                    ~result_df[column].astype(str).str.contains(value, case=False, na=False)
-                ]
-            elif operator == "greater":
+                m = ~self._lowered(df, column).str.contains(str(value).lower(), regex=False)
+            elif operator in ("greater", "less"):
                 # Handle length comparisons for string columns
                 if "length" in str(filter_item.get("column", "")).lower():
-                    result_df = result_df[
-                        result_df[column].astype(str).str.len() > float(value)
-                    ]
+                    m = _length_mask(series, operator, float(value))
+                elif operator == "greater":
+                    m = pd.to_numeric(series, errors="coerce") > float(value)
                 else:
-                    result_df = result_df[
-                        pd.to_numeric(result_df[column], errors="coerce") > float(value)
-                    ]
-            elif operator == "less":
-                if "length" in str(filter_item.get("column", "")).lower():
-                    result_df = result_df[
-                        result_df[column].astype(str).str.len() < float(value)
-                    ]
-                else:
-                    result_df = result_df[
-                        pd.to_numeric(result_df[column], errors="coerce") < float(value)
-                    ]
+                    m = pd.to_numeric(series, errors="coerce") < float(value)
             elif operator == "is_empty":
-                result_df = result_df[
-                    result_df[column].isna() | (result_df[column].astype(str).str.strip() == "")
-                ]
+                m = _blank_mask(series)
             elif operator == "not_empty":
-                result_df = result_df[
-                    result_df[column].notna() & (result_df[column].astype(str).str.strip() != "")
-                ]
+                m = ~_blank_mask(series)
+            else:
+                continue
+            
+            if isinstance(m, pd.Series):
+                # Nullable results (NA) count as non-matches
+                m = m.to_numpy(dtype=bool, na_value=False)
+            mask &= m
         
         # Handle grouping
         if plan.get("group_by"):
             group_col = self._find_column(df, plan["group_by"])
             if group_col:
                 if plan.get("aggregation") == "count":
-                    grouped = result_df.groupby(group_col).size().reset_index(name="count")
+                    grouped = df.loc[mask].groupby(group_col).size().reset_index(name="count")
                     return {
                         "type": "grouped",
-                        "data": grouped.to_dict(orient="records"),
+                        "data": grouped,
                         "total_groups": len(grouped),
                     }
                 elif plan.get("aggregation") == "sum":
-                    grouped = result_df.groupby(group_col).sum(numeric_only=True).reset_index()
+                    grouped = df.loc[mask].groupby(group_col).sum(numeric_only=True).reset_index()
                     return {
                         "type": "grouped",
-                        "data": grouped.to_dict(orient="records"),
+                        "data": grouped,
                         "total_groups": len(grouped),
                     }
         
+        # Counted before the limit, so "N of M URLs match" reflects all matches
+        total_matching = int(mask.sum())
+        
         # Select specific columns if requested
         select_cols = plan.get("select_columns", [])
-        if select_cols:
-            valid_cols = [self._find_column(df, c) for c in select_cols]
-            valid_cols = [c for c in valid_cols if c is not None]
-            if valid_cols:
-                result_df = result_df[valid_cols]
+        valid_cols = [self._find_column(df, c) for c in select_cols]
+        valid_cols = [c for c in valid_cols if c is not None]
+        result_df = df.loc[mask, valid_cols] if valid_cols else df.loc[mask]
         
         # Apply limit
         limit = plan.get("limit", 100)
@@ -289,48 +605,34 @@ Examples:
         
         return {
             "type": "list",
-            "data": result_df.to_dict(orient="records"),
-            "total_matching": len(result_df),
+            "data": result_df,
+            "total_matching": total_matching,
             "columns": result_df.columns.tolist(),
         }
     
+    def _lowered(self, df: pd.DataFrame, column: str) -> pd.Series:
+        """Lowercased string view of a column (missing cells become "")."""
+        if df is not self._data_cache:
+            return df[column].astype(SHEET_DTYPE).str.lower().fillna("")
+        
+        lowered = self._lowered_cache.get(column)
+        if lowered is None:
+            lowered = df[column].astype(SHEET_DTYPE).str.lower().fillna("")
+            self._lowered_cache[column] = lowered
+        return lowered
+    
     def _find_column(self, df: pd.DataFrame, search: str) -> Optional[str]:
         """Find the best matching column name."""
         if not search:
             return None
         
-        search_lower = search.lower().strip()
-        
-        # Exact match first
-        for col in df.columns:
-            if col.lower() == search_lower:
-                return col
-        
-        # Partial match
-        for col in df.columns:
-            if search_lower in col.lower() or col.lower() in search_lower:
-                return col
-        
-        # Common mappings
-        mappings = {
-            "url": ["address", "url"],
-            "title": ["title 1", "title", "title tag"],
-            "meta description": ["meta description 1", "meta description"],
-            "status": ["status code"],
-            "indexability": ["indexability", "indexable"],
-            "content": ["content type"],
-            "word count": ["word count"],
-            "h1": ["h1-1", "h1"],
-        }
-        
-        for key, alternatives in mappings.items():
-            if search_lower in key or key in search_lower:
-                for alt in alternatives:
-                    for col in df.columns:
-                        if alt in col.lower():
-                            return col
-        
-        return None
+        return self._column_lookup_for(df).find(search)
+    
+    def _column_lookup_for(self, df: pd.DataFrame) -> _ColumnLookup:
+        """The prebuilt lookup for the cached frame, else one for df."""
+        if df is self._data_cache and self._column_lookup is not None:
+            return self._column_lookup
+        return _ColumnLookup(df.columns)
     
     async def _generate_response(
         self, query: str, plan: dict, result: dict, total_urls: int
@@ -339,7 +641,11 @@ Examples:
         
         # If JSON format was requested, return structured JSON
         if plan.get("return_json"):
-            return json.dumps(result.get("data", []), indent=2)
+            return dumps(result["data"], indent=True).decode()
+        
+        # Rule-based plans and plain counts don't need a second LLM round trip
+        if plan.get("source") == "rules" or plan.get("operation") == "count":
+            return self._format_response(plan, result, total_urls)
         
         system_prompt = """You are an SEO expert explaining audit results.
 Given the user's question and the analysis results, provide clear insights.
@@ -365,7 +671,36 @@ Results:
 - Type: {result.get('type')}
 - Total URLs in dataset: {total_urls}
 - Matching results: {result.get('total_matching', result.get('total_groups', 0))}
-- Data sample: {json.dumps(result.get('data', [])[:10], indent=2)}
+- Data sample: {dumps(result["data"].head(10), indent=True).decode()}
 """
         
-        return llm_client.structured_chat(system_prompt, context)
+        return await llm_client.coalesced_chat(system_prompt, context)
+    
+    def _format_response(self, plan: dict, result: dict, total_urls: int) -> str:
+        """Describe a count/list/grouped result from a fixed template."""
+        data: pd.DataFrame = result["data"]
+        
+        if result.get("type") == "grouped":
+            lines = [
+                f"Grouped {total_urls} URLs by {plan.get('group_by')} "
+                f"into {result.get('total_groups', 0)} groups:"
+            ]
+            for row in data.head(20).itertuples(index=False):
+                lines.append(f"- {row[0] or '(empty)'}: {row[-1]}")
+            return "\n".join(lines)
+        
+        conditions = ", ".join(
+            f"{f.get('column')} {(f.get('operator') or 'equals').replace('_', ' ')} {f.get('value', '')}".strip()
+            for f in plan.get("filters", [])
+        )
+        matching = result.get("total_matching", len(data))
+        share = (matching / total_urls * 100) if total_urls else 0.0
+        lines = [
+            f"{matching} of {total_urls} URLs ({share:.1f}%) match"
+            + (f": {conditions}." if conditions else ".")
+        ]
+        for row in data.head(10).itertuples(index=False):
+            lines.append(f"- {row[0]}")
+        if matching > 10:
+            lines.append(f"...and {matching - 10} more.")
+        return "\n".join(lines)
@@ -1,14 +1,17 @@
+import asyncio
 import logging
 from logging import config
-from typing import Optional
+from typing import Any, Optional
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel,Field
 
 
 from src.orchestrator.orchestrator import Orchestrator
-from src.utils import setup_logging
+from src.agents.analytics_agent import get_ga4_client
+from src.utils import setup_logging, dumps
 from src.config import config
 
 
@@ -32,32 +35,39 @@ class QueryResponse(BaseModel):
     error: Optional[str] = None
 
 
-# # Global orchestrator instance
-# orchestrator: Optional[Orchestrator] = None
+class QueryJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also encodes DataFrames returned by the agents."""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 
 orchestrator = Orchestrator()
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     """Application lifespan manager."""
-#     global orchestrator
-    
-#     # Startup
-#     logger.info("Starting Spike AI Builder...")
-#     logger.info(f"Server will run on {config.server.host}:{config.server.port}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager."""
+    logger.info("Starting Spike AI Builder...")
     
-#     orchestrator = Orchestrator()
-#     logger.info("Orchestrator initialized with Analytics and SEO agents")
+    # Build this worker's GA4 client up front so the first request doesn't pay for it
+    try:
+        await asyncio.to_thread(get_ga4_client)
+    except Exception as e:
+        logger.warning(f"Could not pre-warm GA4 client: {e}")
     
-#     yield
+    yield
     
-#     # Shutdown
-#     logger.info("Shutting down Spike AI Builder...")
+    logger.info("Shutting down Spike AI Builder...")
+    await orchestrator.close()
 
 
 app = FastAPI(
     title="Spike AI Builder",
     description="AI-powered backend for web analytics and SEO queries",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -75,7 +85,7 @@ async def health():
     return {"status": "healthy"}
 
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", response_model=QueryResponse, response_class=QueryJSONResponse)
 async def query(request: QueryRequest):
 
     if orchestrator is None:
@@ -94,7 +104,9 @@ async def query(request: QueryRequest):
             property_id=request.propertyId,
         )
         
-        return QueryResponse(**result)
+        # Agent results can hold DataFrames, which are only turned into
+        # records here, in the same pass that encodes the response
+        return QueryJSONResponse(QueryResponse(**result).model_dump())
         
     except Exception as e:
         logger.exception("Error processing query")
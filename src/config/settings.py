@@ -3,6 +3,8 @@ Configuration module for Spike AI Builder.
 Loads environment variables and provides typed configuration access.
 """
 import os
+import logging
+import tempfile
 from pathlib import Path
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -10,6 +12,8 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class LiteLLMConfig:
@@ -17,6 +21,16 @@ class LiteLLMConfig:
     api_key: str
     base_url: str
     model: str
+    embedding_model: str
+    local_embedding_model: str  # ONNX encoder path; replaces embedding_model
+    local_embedding_tokenizer: str  # tokenizer.json path (blank = next to the model)
+    semantic_cache: bool  # needs embedding_model
+    semantic_cache_threshold: float
+    cache_ttl: float
+    cache_backend: str  # "memory", "sqlite" or "redis"
+    cache_url: str  # SQLite path or Redis URL
+    rpm: int  # client-side request limit per worker process, 0 = unlimited
+    tpm: int  # client-side token limit per worker process, 0 = unlimited
 
 
 @dataclass
@@ -30,7 +44,8 @@ class SEOConfig:
     """Configuration for SEO data source."""
     spreadsheet_url: str
     spreadsheet_id: str
-    credentials_path: Path
+    credentials_path: str  # resolved absolute path
+    cache_dir: Path  # parquet snapshot of the sheet, reused across restarts
 
 
 @dataclass
@@ -38,6 +53,7 @@ class ServerConfig:
     """Configuration for the HTTP server."""
     host: str
     port: int
+    workers: int  # 0 = one per CPU core
 
 
 @dataclass
@@ -50,6 +66,14 @@ class AppConfig:
     log_level: str
 
 
+def _resolve_credentials(project_root: Path, env_var: str) -> str:
+    """Resolve a credentials file path once, warning early if it's missing."""
+    path = str((project_root / os.getenv(env_var, "credentials.json")).resolve())
+    if not os.path.isfile(path):
+        logger.warning(f"{env_var} points to a missing file: {path}")
+    return path
+
+
 def load_config() -> AppConfig:
     """Load and validate configuration from environment variables."""
     
@@ -61,6 +85,16 @@ def load_config() -> AppConfig:
             api_key=os.getenv("LITELLM_API_KEY", ""),
             base_url=os.getenv("LITELLM_BASE_URL", "http://3.110.18.218"),
             model=os.getenv("LITELLM_MODEL", "gemini-2.5-flash"),
+            embedding_model=os.getenv("LITELLM_EMBEDDING_MODEL", ""),
+            local_embedding_model=os.getenv("LITELLM_LOCAL_EMBEDDING_MODEL", ""),
+            local_embedding_tokenizer=os.getenv("LITELLM_LOCAL_EMBEDDING_TOKENIZER", ""),
+            semantic_cache=os.getenv("LITELLM_SEMANTIC_CACHE", "false").lower() == "true",
+            semantic_cache_threshold=float(os.getenv("LITELLM_SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            cache_ttl=float(os.getenv("LITELLM_CACHE_TTL", "3600")),
+            cache_backend=os.getenv("LITELLM_CACHE_BACKEND", "memory"),
+            cache_url=os.getenv("LITELLM_CACHE_URL", ""),
+            rpm=int(os.getenv("LITELLM_RPM", "0")),
+            tpm=int(os.getenv("LITELLM_TPM", "0")),
         ),
         ga4=GA4Config(
             credentials_path=project_root / os.getenv("GA4_CREDENTIALS_PATH", "credentials.json"),
@@ -71,14 +105,13 @@ def load_config() -> AppConfig:
                 "SEO_SPREADSHEET_ID",
                 "1zzf4ax_H2WiTBVrJigGjF2Q3Yz-qy2qMCbAMKvl6VEE"
             ),
-            credentials_path=project_root / os.getenv(
-                "SEO_CREDENTIALS_PATH",
-                "credentials.json"
-            ),
+            credentials_path=_resolve_credentials(project_root, "SEO_CREDENTIALS_PATH"),
+            cache_dir=Path(os.getenv("SEO_CACHE_DIR") or tempfile.gettempdir()),
         ),
         server=ServerConfig(
             host=os.getenv("SERVER_HOST", "0.0.0.0"),
             port=int(os.getenv("SERVER_PORT", "8080")),
+            workers=int(os.getenv("SERVER_WORKERS", "0")),
         ),
         log_level=os.getenv("LOG_LEVEL", "INFO"),
     )
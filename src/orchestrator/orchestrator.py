@@ -1,21 +1,93 @@
-import json
+import re
+import asyncio
 import logging
+import functools
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+
+import orjson
 
 from src.agents import BaseAgent, AgentResponse, AnalyticsAgent, SEOAgent
-from src.utils import llm_client
+from src.utils import llm_client, dumps, extract_json, LLMCache, make_key, normalize_query
 
 logger = logging.getLogger(__name__)
 
+# Keyword routing, tried before the routing LLM and used when its answer
+# can't be parsed
+ANALYTICS_KEYWORDS = ("page view", "session", "traffic", "user", "ga4", "analytics", "daily", "trend")
+SEO_KEYWORDS = ("url", "title tag", "meta", "https", "indexab", "seo", "screaming frog")
+_ANALYTICS_KEYWORDS_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in ANALYTICS_KEYWORDS), re.IGNORECASE
+)
+_SEO_KEYWORDS_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in SEO_KEYWORDS), re.IGNORECASE
+)
+# Phrasings that join an analytics ranking with SEO attributes, e.g.
+# "top pages by views with their title tags"
+_CROSS_AGENT_RE = re.compile(
+    r"\bwith (?:their|its)\b|\balong with\b"
+    r"|\bby (?:page ?views|views|sessions|users|traffic)\b"
+)
+
+INTENT_CACHE_TTL = 3600
+
+# Distinct keywords a single-domain query needs before the LLM router is
+# skipped; the keyword lists are coarse, so one hit isn't enough
+MIN_KEYWORD_HITS = 2
+
 
-@dataclass
+@functools.lru_cache(maxsize=1024)
+def _keyword_hits(query: str) -> tuple[int, int, bool]:
+    """(distinct analytics keywords, distinct SEO keywords, cross-agent phrasing)."""
+    return (
+        len({m.group(0).lower() for m in _ANALYTICS_KEYWORDS_RE.finditer(query)}),
+        len({m.group(0).lower() for m in _SEO_KEYWORDS_RE.finditer(query)}),
+        _CROSS_AGENT_RE.search(query) is not None,
+    )
+
+
+@dataclass(frozen=True)
 class QueryIntent:
     """Represents the detected intent of a query."""
     requires_analytics: bool
     requires_seo: bool
     is_cross_agent: bool
     reasoning: str
+    source: str = "llm"  # "llm" or "keywords"
+
+
+def _keyword_intent(query: str) -> QueryIntent:
+    """Best-effort intent from keywords alone; the fallback when the LLM fails."""
+    analytics_hits, seo_hits, _ = _keyword_hits(query)
+    return QueryIntent(
+        requires_analytics=analytics_hits > 0 or seo_hits == 0,  # Default to analytics
+        requires_seo=seo_hits > 0,
+        is_cross_agent=analytics_hits > 0 and seo_hits > 0,
+        reasoning="Keyword-based detection",
+        source="keywords",
+    )
+
+
+def _keyword_route(query: str) -> Optional[QueryIntent]:
+    """
+    Intent for queries the keywords route with high confidence, else None.
+    
+    Cross-agent phrasing ("top pages by views with their title tags") is
+    routed to both agents only when both keyword lists match; otherwise
+    the LLM decides, since a ranking like "by views" may not match any
+    analytics keyword. A single-domain query needs MIN_KEYWORD_HITS
+    distinct keywords and none from the other domain.
+    """
+    analytics_hits, seo_hits, cross_phrasing = _keyword_hits(query)
+    if cross_phrasing:
+        if analytics_hits and seo_hits:
+            return _keyword_intent(query)
+        return None
+    if analytics_hits >= MIN_KEYWORD_HITS and not seo_hits:
+        return _keyword_intent(query)
+    if seo_hits >= MIN_KEYWORD_HITS and not analytics_hits:
+        return _keyword_intent(query)
+    return None
 
 
 class Orchestrator:
@@ -28,6 +100,7 @@ class Orchestrator:
         self.analytics_agent = AnalyticsAgent()
         self.seo_agent = SEOAgent()
         self.agents: list[BaseAgent] = [self.analytics_agent, self.seo_agent]
+        self._intent_cache = LLMCache(ttl=INTENT_CACHE_TTL, max_entries=1024)
     
     async def process_query(
         self,
@@ -49,8 +122,8 @@ class Orchestrator:
             intent = await self._detect_intent(query)
             logger.info(f"Detected intent: {intent}")
             
-            # Step 2: Route to appropriate agent(s)
-            responses: list[AgentResponse] = []
+            # Step 2: Route to appropriate agent(s), running them concurrently
+            calls = {}
             
             if intent.requires_analytics:
                 if not property_id:
@@ -63,14 +136,30 @@ class Orchestrator:
                         },
                     }
                 
-                analytics_response = await self.analytics_agent.process(
-                    query, property_id=property_id
+                # LLM routing is trusted; keyword fallback lets the agent
+                # reject queries it can't handle before spending an LLM call
+                calls[self.analytics_agent.name] = self.analytics_agent.process(
+                    query,
+                    property_id=property_id,
+                    routed=intent.source == "llm",
                 )
-                responses.append(analytics_response)
             
             if intent.requires_seo:
-                seo_response = await self.seo_agent.process(query)
-                responses.append(seo_response)
+                calls[self.seo_agent.name] = self.seo_agent.process(query)
+            
+            results = await asyncio.gather(*calls.values(), return_exceptions=True)
+            responses: list[AgentResponse] = []
+            for agent_name, result in zip(calls, results):
+                if isinstance(result, Exception):
+                    logger.error(f"{agent_name} agent failed: {result}")
+                    result = AgentResponse(
+                        success=False,
+                        data=None,
+                        message="",
+                        agent_name=agent_name,
+                        error=str(result),
+                    )
+                responses.append(result)
             
             # Step 3: Aggregate responses
             if not responses:
@@ -93,8 +182,35 @@ class Orchestrator:
                 "error": str(e),
             }
     
+    async def close(self) -> None:
+        """Release agent resources (HTTP sessions)."""
+        await self.seo_agent.close()
+    
     async def _detect_intent(self, query: str) -> QueryIntent:
-        """Use LLM to detect the intent and required agents."""
+        """
+        Detect the intent and required agents.
+        
+        High-confidence keyword matches (see _keyword_route) are routed
+        directly; everything else goes to the LLM, whose answers are cached
+        per normalized query.
+        """
+        normalized = normalize_query(query)
+        
+        # Skip the LLM when the keywords leave no doubt
+        keyword_route = _keyword_route(normalized)
+        if keyword_route is not None:
+            if keyword_route.is_cross_agent:
+                return keyword_route
+            agent = self.analytics_agent if keyword_route.requires_analytics else self.seo_agent
+            if agent.can_handle(query):
+                return keyword_route
+        
+        cache_key = make_key("intent", normalized)
+        cached = self._intent_cache.check(cache_key)
+        if cached is not None:
+            logger.debug("Intent cache hit")
+            return QueryIntent(**orjson.loads(cached))
+        
         system_prompt = """You are a query router for a multi-agent system with two agents:
 
 1. ANALYTICS AGENT: Handles Google Analytics 4 (GA4) queries about:
@@ -122,37 +238,21 @@ Analyze the query and return ONLY valid JSON:
 Cross-agent queries combine both (e.g., "top pages by views with their title tags").
 """
         
-        response = llm_client.structured_chat(system_prompt, query, temperature=0.1)
+        response = await llm_client.coalesced_chat(system_prompt, query, temperature=0.1)
         
-        try:
-            json_start = response.find("{")
-            json_end = response.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                data = json.loads(response[json_start:json_end])
-                return QueryIntent(
-                    requires_analytics=data.get("requires_analytics", False),
-                    requires_seo=data.get("requires_seo", False),
-                    is_cross_agent=data.get("is_cross_agent", False),
-                    reasoning=data.get("reasoning", ""),
-                )
-        except json.JSONDecodeError:
-            pass
+        data = extract_json(response)
+        if isinstance(data, dict):
+            intent = QueryIntent(
+                requires_analytics=data.get("requires_analytics", False),
+                requires_seo=data.get("requires_seo", False),
+                is_cross_agent=data.get("is_cross_agent", False),
+                reasoning=data.get("reasoning", ""),
+            )
+            self._intent_cache.save(cache_key, None, orjson.dumps(asdict(intent)).decode())
+            return intent
         
         # Fallback: use keyword detection
-        query_lower = query.lower()
-        
-        analytics_keywords = ["page view", "session", "traffic", "user", "ga4", "analytics", "daily", "trend"]
-        seo_keywords = ["url", "title tag", "meta", "https", "indexab", "seo", "screaming frog"]
-        
-        has_analytics = any(kw in query_lower for kw in analytics_keywords)
-        has_seo = any(kw in query_lower for kw in seo_keywords)
-        
-        return QueryIntent(
-            requires_analytics=has_analytics or (not has_seo),  # Default to analytics
-            requires_seo=has_seo,
-            is_cross_agent=has_analytics and has_seo,
-            reasoning="Keyword-based detection",
-        )
+        return _keyword_intent(normalized)
     
     def _format_single_response(self, response: AgentResponse) -> dict:
         """Format a single agent response."""
@@ -207,15 +307,15 @@ Guidelines:
 User Question: {query}
 
 Analytics Data:
-{json.dumps(analytics_data, indent=2) if analytics_data else "Not available"}
+{dumps(analytics_data, indent=True).decode() if analytics_data else "Not available"}
 
 SEO Data:
-{json.dumps(seo_data, indent=2) if seo_data else "Not available"}
+{dumps(seo_data, indent=True).decode() if seo_data else "Not available"}
 
 Intent: {intent.reasoning}
 """
         
-        fused_message = llm_client.structured_chat(system_prompt, context)
+        fused_message = await llm_client.coalesced_chat(system_prompt, context)
         
         return {
             "success": True,
@@ -1,4 +1,13 @@
-from .llm_client import LLMClient, llm_client
+from .llm_client import LLMClient, AsyncLLMClient, LLMUsage, ClientMetrics, llm_client, cache_breakpoint, count_tokens
+from .llm_cache import LLMCache, make_key, normalize_query
+from .cache_backends import CacheBackend, MemoryLRU, SQLiteBackend, RedisBackend, make_backend
+from .micro_batcher import MicroBatcher
+from .rate_limiter import TokenBucket
 from .logging_config import setup_logging
+from .serialization import dumps, extract_json, frame_records
 
-__all__ = ["LLMClient", "llm_client", "setup_logging"]
\ No newline at end of file
+__all__ = [
+    "LLMClient", "AsyncLLMClient", "LLMUsage", "ClientMetrics", "llm_client", "cache_breakpoint", "count_tokens", "LLMCache", "make_key", "normalize_query",
+    "CacheBackend", "MemoryLRU", "SQLiteBackend", "RedisBackend", "make_backend",
+    "MicroBatcher", "TokenBucket", "setup_logging", "dumps", "extract_json", "frame_records",
+]
\ No newline at end of file
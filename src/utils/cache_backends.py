@@ -0,0 +1,149 @@
+"""
+Storage backends for the LLM clients' exact-match response cache.
+Memory is per process; SQLite survives restarts; Redis is shared across
+workers and machines.
+"""
+import os
+import time
+import sqlite3
+import tempfile
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+# How often (in writes) SQLiteBackend sweeps expired rows
+SQLITE_PURGE_EVERY = 256
+
+
+class CacheBackend(Protocol):
+    """Key/value store for cached completions, with per-entry TTL."""
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+
+class MemoryLRU:
+    """In-process LRU of at most max_entries values."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteBackend:
+    """Cache table in a local SQLite file, kept across restarts."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, val BLOB, expires INTEGER)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._purge()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE expires > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT val, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() >= row[1]:
+            return None
+        return row[0].decode("utf-8")
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, val, expires) VALUES (?, ?, ?)",
+                (key, value.encode("utf-8"), int(time.time() + ttl)),
+            )
+            self._writes += 1
+            if self._writes % SQLITE_PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires <= ?", (int(time.time()),))
+
+    def _purge(self) -> None:
+        """Drop rows that expired while nothing was running."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires <= ?", (int(time.time()),))
+
+
+class RedisBackend:
+    """Cache in Redis, shared by every worker pointing at the same server."""
+
+    def __init__(self, url: str, prefix: str = "llm:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisBackend requires the 'redis' package") from e
+
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.setex(self.prefix + key, max(1, int(ttl)), value)
+
+
+def make_backend(kind: str, url: str = "", max_entries: int = 1024) -> CacheBackend:
+    """
+    Build a cache backend from configuration.
+
+    Args:
+        kind: "memory", "sqlite" or "redis"
+        url: Redis URL or SQLite file path (blank = llm_cache.sqlite3 in
+            the system temp dir)
+        max_entries: Size of the memory backend
+
+    Returns:
+        The backend; unknown kinds fall back to memory
+    """
+    kind = kind.lower()
+    if kind == "sqlite":
+        return SQLiteBackend(url or os.path.join(tempfile.gettempdir(), "llm_cache.sqlite3"))
+    if kind == "redis":
+        return RedisBackend(url)
+    if kind != "memory":
+        logger.warning("Unknown LLM cache backend %r, using memory", kind)
+    return MemoryLRU(max_entries)
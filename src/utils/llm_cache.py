@@ -0,0 +1,203 @@
+"""
+Response cache for LLM calls.
+Exact hits are keyed by a SHA-256 of the prompt inputs; misses can fall back
+to a cosine-similarity search over stored query embeddings.
+"""
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Embedding matrix rows allocated up front; grows by doubling to max_entries
+MATRIX_INITIAL_ROWS = 256
+
+# Above this many rows, search with a FAISS HNSW index when faiss is installed
+FAISS_MIN_ENTRIES = 10_000
+FAISS_CANDIDATES = 8
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(query.lower().split())
+
+
+def make_key(*parts: Any) -> str:
+    """Build a SHA-256 cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """LRU + TTL cache of stringified LLM responses with semantic fallback."""
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        similarity_threshold: float = 0.92,
+        max_entries: int = 1024,
+    ):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+        # Embeddings live in one contiguous float32 matrix, one row per key;
+        # rows freed by eviction are zeroed and reused, so a lookup is a
+        # single BLAS matrix-vector product over the used rows
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: dict[str, int] = {}
+        self._row_keys: list[Optional[str]] = []
+        self._free_rows: list[int] = []
+
+        # Optional FAISS HNSW index once the matrix is large; ids map to rows
+        self._index: Any = None
+        self._index_rows: list[int] = []
+
+    def check(
+        self, prompt_hash: str, embedding: Optional[Sequence[float]] = None
+    ) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            prompt_hash: Exact-match key from make_key()
+            embedding: Optional query embedding for similarity lookup
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        entry = self._entries.get(prompt_hash)
+        if entry is not None:
+            if self._is_fresh(entry):
+                self._entries.move_to_end(prompt_hash)
+                return entry[1]
+            self._evict(prompt_hash)
+
+        if embedding is None or not self._rows:
+            return None
+
+        query = self._normalize(embedding)
+        if query.shape[0] != self._matrix.shape[1]:
+            return None
+
+        row, score = self._search(query)
+        if score < self.similarity_threshold:
+            return None
+
+        key = self._row_keys[row]
+        match = self._entries.get(key) if key is not None else None
+        if match is None or not self._is_fresh(match):
+            self._evict(key)
+            return None
+
+        logger.debug("Semantic cache hit (similarity=%.3f)", score)
+        self._entries.move_to_end(key)
+        return match[1]
+
+    def save(
+        self,
+        prompt_hash: str,
+        embedding: Optional[Sequence[float]],
+        response: str,
+    ) -> None:
+        """Store a response, indexing its embedding when one is given."""
+        self._entries[prompt_hash] = (time.time(), response)
+        self._entries.move_to_end(prompt_hash)
+        if embedding is not None:
+            self._store_embedding(prompt_hash, self._normalize(embedding))
+
+        # Evict least recently used entries beyond the size bound
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def _search(self, query: np.ndarray) -> tuple[int, float]:
+        """Best (row, cosine similarity) for a normalized query."""
+        used = len(self._row_keys)
+        if used >= FAISS_MIN_ENTRIES and self._ensure_index():
+            _, ids = self._index.search(query[None, :], FAISS_CANDIDATES)
+            rows = [self._index_rows[i] for i in ids[0] if i >= 0]
+            if rows:
+                # Re-score exactly: ids can point at rows since reused
+                scores = self._matrix[rows] @ query
+                best = int(scores.argmax())
+                return rows[best], float(scores[best])
+
+        scores = self._matrix[:used] @ query
+        best = int(scores.argmax())
+        return best, float(scores[best])
+
+    def _store_embedding(self, prompt_hash: str, vector: np.ndarray) -> None:
+        """Write a normalized embedding into the key's matrix row."""
+        if self._matrix is None:
+            self._matrix = np.zeros(
+                (min(self.max_entries, MATRIX_INITIAL_ROWS), vector.shape[0]), dtype=np.float32
+            )
+        elif vector.shape[0] != self._matrix.shape[1]:
+            logger.warning("Skipping embedding with mismatched dimension")
+            return
+
+        row = self._rows.get(prompt_hash)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._row_keys[row] = prompt_hash
+            else:
+                row = len(self._row_keys)
+                if row == self._matrix.shape[0]:
+                    grown = np.zeros(
+                        (min(self.max_entries + 1, row * 2), self._matrix.shape[1]),
+                        dtype=np.float32,
+                    )
+                    grown[:row] = self._matrix
+                    self._matrix = grown
+                self._row_keys.append(prompt_hash)
+            self._rows[prompt_hash] = row
+
+        self._matrix[row] = vector
+        if self._index is not None:
+            self._index.add(vector[None, :])
+            self._index_rows.append(row)
+
+    def _ensure_index(self) -> bool:
+        """Build the FAISS index if faiss is installed; False otherwise."""
+        if self._index is not None:
+            # Rebuild once stale ids (evicted or rewritten rows) dominate
+            if len(self._index_rows) <= 2 * len(self._rows):
+                return True
+            self._index = None
+
+        try:
+            import faiss
+        except ImportError:
+            return False
+
+        used = len(self._row_keys)
+        self._index = faiss.IndexHNSWFlat(self._matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        self._index.add(self._matrix[:used])
+        self._index_rows = list(range(used))
+        return True
+
+    def _is_fresh(self, entry: tuple[float, str]) -> bool:
+        return (time.time() - entry[0]) < self.ttl
+
+    def _evict(self, prompt_hash: str) -> None:
+        self._entries.pop(prompt_hash, None)
+        row = self._rows.pop(prompt_hash, None)
+        if row is not None:
+            # A zero row scores 0 and can never pass the threshold
+            self._matrix[row] = 0.0
+            self._row_keys[row] = None
+            self._free_rows.append(row)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,47 +1,790 @@
 """
 LLM Client utility for interacting with LiteLLM API.
-Includes exponential backoff for rate limit handling.
+Includes exponential backoff with full jitter for rate limit handling.
 """
+import re
+import json
 import time
+import atexit
+import random
+import asyncio
+import hashlib
 import logging
-from typing import Optional
-from openai import OpenAI, APIError, APIConnectionError, RateLimitError, APITimeoutError
+import threading
+from collections import OrderedDict
+from collections.abc import Sized
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, Union
+
+import httpx
+import orjson
+from openai import OpenAI, AsyncOpenAI, NOT_GIVEN, APIError, APIConnectionError, RateLimitError, APITimeoutError
 
 from src.config import config
+from .cache_backends import CacheBackend, make_backend
+from .llm_cache import LLMCache, make_key
+from .local_embedder import LocalEmbedder, get_local_embedder
+from .rate_limiter import TokenBucket, per_minute_bucket
+from .serialization import extract_json
 
 logger = logging.getLogger(__name__)
 
+# Distinct system prompts / parameter sets that keep a semantic store
+SEMANTIC_MAX_SCOPES = 64
 
-class LLMClient:
-    """Client for interacting with LiteLLM API."""
+# Keep-alive pool shared by every request to the LiteLLM proxy
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=50,
+    keepalive_expiry=30.0,
+)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)  # 60 second timeout
+
+# Statuses worth retrying; any other API error is raised at once
+RETRIABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+VALID_ROLES = frozenset({"system", "user", "assistant", "tool"})
+
+# Context windows of the models served through the proxy; others aren't checked
+MODEL_CONTEXT_WINDOWS = {
+    "gemini-2.5-flash": 1_048_576,
+    "gemini-2.5-pro": 1_048_576,
+    "gemini-2.0-flash": 1_048_576,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+}
+# tiktoken encoding for models it doesn't know (e.g. Gemini); close enough
+# for guardrails and rate limiting
+TIKTOKEN_FALLBACK_ENCODING = "o200k_base"
+MESSAGE_TOKEN_OVERHEAD = 4  # role and separators per chat message
+
+# Average-latency ceilings (seconds) for grades D, C, B and A
+GRADE_LATENCY_LIMITS_S = (10.0, 5.0, 2.0, 1.0)
+GRADE_CACHE_HIT_RATIO = 0.3
+
+# Rate-limit reset headers use durations like "250ms" or "1m30s"
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Independent prompts packed into one chat_batch() request
+BATCH_MAX_PROMPTS = 20
+BATCH_INSTRUCTIONS = """You will receive numbered prompts, each marked like [1].
+Answer every prompt independently, as if it were the only one.
+Return ONLY valid JSON mapping each prompt number to its answer as a string:
+{"1": "answer to [1]", "2": "answer to [2]"}"""
+
+# Providers only cache prompt prefixes above ~1024 tokens (~4 chars each)
+CACHE_PREFIX_MIN_CHARS = 4096
+_SENTENCE_END_RE = re.compile(r"[.!?](?:\s+|$)|\n\s*\n")
+
+# API clients (and their connection pools) shared by all LLM clients with
+# the same endpoint and key
+_CLIENT_REGISTRY: dict[str, Union[OpenAI, AsyncOpenAI]] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# tiktoken encoders by model, loaded once; None when tiktoken is unavailable
+_ENCODERS: dict[str, Any] = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse "2", "1.5", "250ms" or "1m30s" style durations into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    parts = _DURATION_RE.findall(value)
+    if not parts or "".join(amount + unit for amount, unit in parts) != value:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds the server asked us to wait, from the error's response headers.
+    
+    Reads retry-after-ms, Retry-After (seconds or HTTP date) and the
+    x-ratelimit-reset-requests/tokens headers OpenAI-compatible APIs send;
+    a reset header is skipped when its x-ratelimit-remaining-* header
+    shows that limit still has budget.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    waits = []
+    if headers.get("retry-after-ms"):
+        duration = _parse_duration(headers["retry-after-ms"])
+        if duration is not None:
+            waits.append(duration / 1000)
+    
+    if headers.get("retry-after"):
+        duration = _parse_duration(headers["retry-after"])
+        if duration is None:
+            try:
+                duration = (
+                    parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time()
+                )
+            except (TypeError, ValueError):
+                duration = None
+        if duration is not None:
+            waits.append(duration)
+    
+    for limit in ("requests", "tokens"):
+        # Only wait out a limit that is spent; the other may reset much later
+        remaining = headers.get(f"x-ratelimit-remaining-{limit}")
+        try:
+            if remaining is not None and float(remaining) > 0:
+                continue
+        except ValueError:
+            pass
+        reset = headers.get(f"x-ratelimit-reset-{limit}")
+        if reset:
+            duration = _parse_duration(reset)
+            if duration is not None:
+                waits.append(duration)
+    
+    return max(waits) if waits and max(waits) > 0 else None
+
+
+def _encoder(model: str) -> Any:
+    """The tiktoken encoding for a model, or None without tiktoken."""
+    if model in _ENCODERS:
+        return _ENCODERS[model]
+    
+    with _ENCODERS_LOCK:
+        if model in _ENCODERS:
+            return _ENCODERS[model]
+        try:
+            import tiktoken
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding(TIKTOKEN_FALLBACK_ENCODING)
+        except Exception as e:
+            logger.debug("tiktoken unavailable, estimating tokens from length: %s", e)
+            encoder = None
+        _ENCODERS[model] = encoder
+        return encoder
+
+
+def count_tokens(model: str, messages: list[dict]) -> int:
+    """
+    Input tokens of a chat request, counted with tiktoken when installed.
+    
+    Args:
+        model: Model the request goes to
+        messages: List of message dictionaries with 'role' and 'content'
+        
+    Returns:
+        The token count, or a ~4 characters per token estimate
+    """
+    encoder = _encoder(model)
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            text = "".join(block.get("text", "") for block in content)
+        else:
+            text = str(content)
+        if encoder is not None:
+            total += len(encoder.encode(text, disallowed_special=()))
+        else:
+            total += len(text) // 4
+        total += MESSAGE_TOKEN_OVERHEAD
+    return total
+
+
+class _OrjsonBodyMixin:
+    """
+    Encode JSON request bodies with orjson rather than the SDK's stdlib json.
+    
+    The SDK sends a pre-encoded bytes body as-is, so the dict is swapped for
+    orjson output before the request is built. Bodies orjson can't encode,
+    or that the SDK still has to merge extra_body into, are left alone.
+    """
+    
+    def _build_request(self, options: Any, **kwargs: Any) -> httpx.Request:
+        json_data = options.json_data
+        if (
+            isinstance(json_data, dict)
+            and options.extra_json is None
+            and options.files is None
+            and getattr(options, "content", None) is None
+        ):
+            try:
+                options = options.model_copy(update={"json_data": orjson.dumps(json_data)})
+            except TypeError:
+                pass
+        return super()._build_request(options, **kwargs)
+
+
+class _OrjsonOpenAI(_OrjsonBodyMixin, OpenAI):
+    pass
+
+
+class _OrjsonAsyncOpenAI(_OrjsonBodyMixin, AsyncOpenAI):
+    pass
+
+
+def _shared_client(kind: str, api_key: str, base_url: str) -> Union[OpenAI, AsyncOpenAI]:
+    """
+    Get or create the pooled API client for an endpoint.
+    
+    Args:
+        kind: "sync" for OpenAI, "async" for AsyncOpenAI
+        api_key: LiteLLM API key
+        base_url: LiteLLM base URL
+        
+    Returns:
+        The client shared by every caller with the same arguments
+    """
+    key = hashlib.sha256(f"{kind}|{api_key}|{base_url}".encode("utf-8")).hexdigest()
+    with _REGISTRY_LOCK:
+        client = _CLIENT_REGISTRY.get(key)
+        if client is not None:
+            return client
+        
+        # The SDK's own retries are disabled: _backoff() is the only policy
+        if kind == "async":
+            http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, http2=True)
+            client = _OrjsonAsyncOpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0
+            )
+        else:
+            http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, http2=True)
+            client = _OrjsonOpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0
+            )
+            atexit.register(http_client.close)
+        
+        _CLIENT_REGISTRY[key] = client
+        return client
+
+
+def _cached_block(text: str) -> dict:
+    """Text content block marked as the end of a cacheable prompt prefix."""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def cache_breakpoint(prompt: str, min_chars: int = CACHE_PREFIX_MIN_CHARS) -> list[dict]:
+    """
+    Split a long system prompt into content blocks with an early cache breakpoint.
+    
+    The first chunk runs to the first sentence boundary past min_chars and
+    is marked with cache_control; the rest follows unmarked, so edits to
+    the end of the prompt still reuse the cached head.
+    
+    Args:
+        prompt: The system prompt text
+        min_chars: Smallest prefix worth caching
+        
+    Returns:
+        Content blocks for a system message
+    """
+    match = _SENTENCE_END_RE.search(prompt, min_chars)
+    if len(prompt) < min_chars or match is None:
+        return [_cached_block(prompt)]
+    
+    head, tail = prompt[:match.end()], prompt[match.end():]
+    blocks = [_cached_block(head)]
+    if tail.strip():
+        blocks.append({"type": "text", "text": tail})
+    return blocks
+
+
+@dataclass
+class LLMUsage:
+    """Token usage for one completion, including provider prompt-cache reads."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    
+    @classmethod
+    def from_completion(cls, usage: Any) -> "LLMUsage":
+        """Build from an OpenAI-format usage block (as returned by LiteLLM)."""
+        if usage is None:
+            return cls()
+        
+        # OpenAI/Gemini report cache reads under prompt_tokens_details;
+        # Anthropic via LiteLLM reports cache_read_input_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (
+            getattr(details, "cached_tokens", None)
+            or getattr(usage, "cache_read_input_tokens", None)
+            or 0
+        )
+        return cls(
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=cached,
+        )
+
+
+@dataclass
+class ClientMetrics:
+    """Counters for one client's API calls and response cache."""
+    total_requests: int = 0  # API attempts, including retries
+    successes: int = 0  # completed non-streaming requests
+    streams_opened: int = 0
+    rate_limits: int = 0
+    connection_errors: int = 0
+    timeouts: int = 0
+    server_errors: int = 0
+    client_errors: int = 0  # not retried
+    cache_hits: int = 0
+    cache_misses: int = 0
+    semantic_hits: int = 0
+    total_latency_s: float = 0.0
+    slowest_s: float = 0.0
+    fastest_s: Optional[float] = None
+    
+    @property
+    def cache_hit_ratio(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+    
+    @property
+    def avg_latency_s(self) -> float:
+        return self.total_latency_s / self.successes if self.successes else 0.0
+    
+    def grade_performance(self) -> str:
+        """
+        Letter grade (A-F) from average latency, lifted one grade by a
+        cache hit ratio of at least GRADE_CACHE_HIT_RATIO.
+        """
+        score = sum(self.avg_latency_s <= limit for limit in GRADE_LATENCY_LIMITS_S)
+        if self.cache_hit_ratio >= GRADE_CACHE_HIT_RATIO:
+            score += 1
+        return "FDCBA"[min(score, 4)]
+
+
+class _LLMClientBase:
+    """Configuration, response caching and retry policy shared by the clients."""
     
     def __init__(
         self,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model: Optional[str] = None,
+        embedding_model: Optional[str] = None,
         max_retries: int = 5,
         base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: int = 1024,
+        cache_backend: Optional[CacheBackend] = None,
+        semantic_cache: Optional[bool] = None,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        context_window: Optional[int] = None,
     ):
         self.api_key = api_key or config.litellm.api_key
         self.base_url = base_url or config.litellm.base_url
         self.model = model or config.litellm.model
+        self.embedding_model = embedding_model or config.litellm.embedding_model
         self.max_retries = max_retries
         self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_output_tokens = max_output_tokens  # model's limit, if known
+        self.context_window = context_window  # overrides MODEL_CONTEXT_WINDOWS
+        
+        self.client = self._create_client()
+        
+        # Client-side RPM/TPM gates in front of every completion request,
+        # so we wait locally instead of drawing 429s (0 = unlimited)
+        rpm = rpm if rpm is not None else config.litellm.rpm
+        tpm = tpm if tpm is not None else config.litellm.tpm
+        self._req_bucket: Optional[TokenBucket] = per_minute_bucket(rpm) if rpm else None
+        self._tok_bucket: Optional[TokenBucket] = per_minute_bucket(tpm) if tpm else None
+        
+        # In-flight coalesced calls, keyed by a hash of the full request
+        self._inflight: dict[str, asyncio.Task] = {}
+        
+        # In-flight chat() calls, so identical concurrent requests from
+        # worker threads share one API call
+        self._pending: dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        
+        # Exact-match response cache for deterministic (temperature 0) calls,
+        # in memory, SQLite or Redis per LITELLM_CACHE_BACKEND; chat() runs
+        # in worker threads, so the counters are locked
+        self.cache_ttl = cache_ttl if cache_ttl is not None else config.litellm.cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self._cache: CacheBackend = cache_backend or make_backend(
+            config.litellm.cache_backend, config.litellm.cache_url, cache_max_entries
+        )
+        self._cache_lock = threading.Lock()
+        
+        self._metrics = ClientMetrics()
+        self._metrics_lock = threading.Lock()
+        
+        # Semantic fallback: one embedding store per (model, system prompt,
+        # parameters) scope, so only the user text is compared
+        if semantic_cache is None:
+            semantic_cache = config.litellm.semantic_cache
+        self.semantic_cache = semantic_cache and bool(
+            self.embedding_model or config.litellm.local_embedding_model
+        )
+        self._local_embedder: Optional[LocalEmbedder] = None
+        self._local_embedder_failed = False
+        self._semantic: OrderedDict[str, LLMCache] = OrderedDict()
+    
+    @staticmethod
+    def _cache_key(
+        model: str,
+        messages: list[dict],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[dict],
+    ) -> Optional[str]:
+        """SHA-256 key of the request, or None when sampling makes it uncacheable."""
+        if temperature > 0:
+            return None
+        return make_key(model, messages, temperature, max_tokens, response_format)
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        try:
+            cached = self._cache.get(key)
+        except Exception as e:
+            logger.warning("LLM cache read failed: %s: %s", type(e).__name__, e)
+            cached = None
+        with self._metrics_lock:
+            if cached is not None:
+                self._metrics.cache_hits += 1
+            else:
+                self._metrics.cache_misses += 1
+        return cached
+    
+    def _cache_put(self, key: str, content: str) -> None:
+        try:
+            self._cache.set(key, content, self.cache_ttl)
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s: %s", type(e).__name__, e)
+    
+    @staticmethod
+    def _user_text(messages: list[dict]) -> str:
+        """Concatenated text of the user turns, for embedding."""
+        parts = []
+        for message in messages:
+            if message.get("role") != "user":
+                continue
+            content = message.get("content")
+            if isinstance(content, list):
+                content = " ".join(block.get("text", "") for block in content)
+            parts.append(str(content))
+        return "\n".join(parts)
+    
+    def _semantic_get(
+        self, scope: str, key: str, embedding: Optional[Sequence[float]]
+    ) -> Optional[str]:
+        if embedding is None:
+            return None
+        with self._cache_lock:
+            store = self._semantic.get(scope)
+            if store is None:
+                return None
+            self._semantic.move_to_end(scope)
+            cached = store.check(key, embedding)
+        if cached is not None:
+            with self._metrics_lock:
+                self._metrics.semantic_hits += 1
+        return cached
+    
+    def _semantic_put(
+        self, scope: str, key: str, embedding: Sequence[float], content: str
+    ) -> None:
+        with self._cache_lock:
+            store = self._semantic.get(scope)
+            if store is None:
+                store = LLMCache(
+                    ttl=self.cache_ttl,
+                    similarity_threshold=config.litellm.semantic_cache_threshold,
+                    max_entries=self.cache_max_entries,
+                )
+                self._semantic[scope] = store
+                while len(self._semantic) > SEMANTIC_MAX_SCOPES:
+                    self._semantic.popitem(last=False)
+            store.save(key, embedding, content)
+    
+    def cache_stats(self) -> dict:
+        """Hit/miss counters and current size of the response cache."""
+        with self._metrics_lock:
+            metrics = self._metrics
+            return {
+                "hits": metrics.cache_hits,
+                "misses": metrics.cache_misses,
+                "hit_rate": metrics.cache_hit_ratio,
+                "semantic_hits": metrics.semantic_hits,
+                "entries": len(self._cache) if isinstance(self._cache, Sized) else None,
+            }
+    
+    def get_metrics_snapshot(self) -> dict:
+        """
+        Request, error, cache and latency counters for tuning retries,
+        concurrency and cache settings.
+        
+        Returns:
+            The ClientMetrics fields plus derived avg_latency_s,
+            cache_hit_ratio and grade
+        """
+        with self._metrics_lock:
+            metrics = self._metrics
+            return {
+                **asdict(metrics),
+                "avg_latency_s": metrics.avg_latency_s,
+                "cache_hit_ratio": metrics.cache_hit_ratio,
+                "grade": metrics.grade_performance(),
+            }
+    
+    def reset_metrics(self) -> None:
+        """Zero all counters."""
+        with self._metrics_lock:
+            self._metrics = ClientMetrics()
+    
+    def _record_success(self, latency: Optional[float]) -> None:
+        """Count a completed request, or an opened stream when latency is None."""
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics.total_requests += 1
+            if latency is None:
+                metrics.streams_opened += 1
+                return
+            metrics.successes += 1
+            metrics.total_latency_s += latency
+            metrics.slowest_s = max(metrics.slowest_s, latency)
+            if metrics.fastest_s is None or latency < metrics.fastest_s:
+                metrics.fastest_s = latency
+    
+    def _record_error(self, kind: str) -> None:
+        """Count a failed attempt under its ClientMetrics error field."""
+        with self._metrics_lock:
+            self._metrics.total_requests += 1
+            setattr(self._metrics, kind, getattr(self._metrics, kind) + 1)
+    
+    def _create_client(self) -> Any:
+        raise NotImplementedError
+    
+    def _local(self) -> Optional[LocalEmbedder]:
+        """The local ONNX embedder, if configured and loadable."""
+        if self._local_embedder is None and not self._local_embedder_failed:
+            model_path = config.litellm.local_embedding_model
+            if not model_path:
+                return None
+            try:
+                self._local_embedder = get_local_embedder(
+                    model_path, config.litellm.local_embedding_tokenizer or None
+                )
+            except Exception as e:
+                # Fall back to the remote embedding model for good
+                logger.warning("Could not load local embedding model: %s", e)
+                self._local_embedder_failed = True
+        return self._local_embedder
+    
+    def _semantic_scope(
+        self,
+        model: str,
+        messages: list[dict],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[dict],
+    ) -> str:
+        """Key of everything but the user text, which is compared by embedding."""
+        return make_key(
+            model,
+            [m for m in messages if m.get("role") != "user"],
+            temperature,
+            max_tokens,
+            response_format,
+        )
+    
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        """
+        Decide whether a failed call is retried.
+        
+        Args:
+            error: The exception raised by the completion request
+            attempt: Zero-based attempt number
+            
+        Returns:
+            Seconds to wait before the next attempt; errors that shouldn't
+            be retried are re-raised
+        """
+        if isinstance(error, RateLimitError):
+            reason, kind = "Rate limited (429)", "rate_limits"
+        elif isinstance(error, APITimeoutError):
+            reason, kind = "Request timeout", "timeouts"
+        elif isinstance(error, APIConnectionError):
+            reason, kind = f"Connection error ({error})", "connection_errors"
+        elif isinstance(error, APIError):
+            status_code = getattr(error, 'status_code', None)
+            if status_code == 429:
+                reason, kind = "Rate limited (429)", "rate_limits"
+            elif status_code in RETRIABLE_STATUS_CODES:
+                reason, kind = f"Server error ({status_code})", "server_errors"
+            else:
+                # Bad request, auth or unknown model - retrying won't help
+                self._record_error("client_errors")
+                if status_code in (401, 403):
+                    logger.error("API Error: %s (check LITELLM_API_KEY)", error)
+                else:
+                    logger.error("API Error: %s", error)
+                raise error
+        else:
+            self._record_error("client_errors")
+            logger.error("Unexpected error: %s: %s", type(error).__name__, error)
+            raise error
+        
+        self._record_error(kind)
+        
+        # Full jitter: spread retries over the whole capped window so callers
+        # throttled together don't retry together
+        wait_time = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        source = "backoff"
+        
+        # Never retry sooner than the server asked us to
+        retry_after = _retry_after(error)
+        if retry_after is not None and retry_after > wait_time:
+            wait_time = min(retry_after, self.max_delay)
+            source = "server"
+        
+        logger.warning(
+            "%s. Retrying in %.2fs (%s) (attempt %d/%d)",
+            reason, wait_time, source, attempt + 1, self.max_retries,
+        )
+        return wait_time
+    
+    def _validate_request(self, model: str, messages: list[dict], max_tokens: int) -> None:
+        """Reject malformed requests before the cache or any attempt is touched."""
+        if not messages:
+            raise ValueError("messages must not be empty")
+        for message in messages:
+            if message.get("role") not in VALID_ROLES:
+                raise ValueError(f"Invalid message role: {message.get('role')!r}")
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {max_tokens}")
+        if self.max_output_tokens is not None and max_tokens > self.max_output_tokens:
+            raise ValueError(
+                f"max_tokens {max_tokens} exceeds the model limit of {self.max_output_tokens}"
+            )
+    
+    def _input_tokens(self, model: str, messages: list[dict], max_tokens: int) -> Optional[int]:
+        """
+        Count a request's input tokens once, for the context check and TPM bucket.
         
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url,
-            timeout=60.0,  # 60 second timeout
+        Called only when the request is about to go to the API, so cache
+        hits never pay for tokenization.
+        
+        Returns:
+            The count, or None when no context window or TPM limit needs it
+        """
+        context_window = (
+            self.context_window or MODEL_CONTEXT_WINDOWS.get(model.rsplit("/", 1)[-1])
+        )
+        if context_window is None and self._tok_bucket is None:
+            return None
+        
+        input_tokens = count_tokens(model, messages)
+        if context_window is not None and input_tokens + max_tokens > context_window:
+            raise ValueError(
+                f"Request needs ~{input_tokens} input + {max_tokens} output tokens, "
+                f"over the {context_window} token context window of {model}"
+            )
+        return input_tokens
+    
+    def _retries_exhausted(self, last_error: Optional[Exception]) -> RuntimeError:
+        error_msg = f"Failed after {self.max_retries} retries. Last error: {last_error}"
+        logger.error(error_msg)
+        return RuntimeError(error_msg)
+    
+    @staticmethod
+    def _structured_messages(
+        system_prompt: str,
+        user_message: str,
+        cacheable_system: bool,
+        cache_prefix: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        System + user messages laid out for provider prompt caching.
+        
+        Providers cache the longest previously seen prefix of the request, so
+        static content goes first and per-call content last: the cache_prefix
+        block, then the system prompt, then the user message.
+        """
+        if cache_prefix:
+            system_content = [_cached_block(cache_prefix)]
+            if system_prompt:
+                system_content.append({"type": "text", "text": system_prompt})
+        elif cacheable_system:
+            system_content = [_cached_block(system_prompt)]
+        else:
+            system_content = system_prompt
+        
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": user_message},
+        ]
+    
+    @staticmethod
+    def _batch_messages(prompts: list[str], system: Optional[str]) -> list[dict]:
+        """Pack numbered prompts into one chat request."""
+        system_prompt = f"{system}\n\n{BATCH_INSTRUCTIONS}" if system else BATCH_INSTRUCTIONS
+        user_message = "\n\n".join(
+            f"[{number}]\n{prompt}" for number, prompt in enumerate(prompts, 1)
         )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ]
+    
+    @staticmethod
+    def _split_batch(content: Optional[str], size: int) -> list[Optional[str]]:
+        """Answers of a packed response by prompt number; None where missing."""
+        data = extract_json(content) if content else None
+        if not isinstance(data, dict):
+            return [None] * size
+        
+        answers = []
+        for number in range(1, size + 1):
+            answer = data.get(str(number))
+            if answer is not None and not isinstance(answer, str):
+                answer = json.dumps(answer)
+            answers.append(answer)
+        return answers
+
+
+class LLMClient(_LLMClientBase):
+    """Client for interacting with LiteLLM API."""
+    
+    def _create_client(self) -> OpenAI:
+        return _shared_client("sync", self.api_key, self.base_url)
+    
+    def chat(self, messages: list[dict], **kwargs) -> str:
+        """
+        Send a chat completion request with exponential backoff.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Additional arguments passed to chat_with_usage()
+            
+        Returns:
+            The assistant's response content
+        """
+        return self.chat_with_usage(messages, **kwargs)[0]
     
-    def chat(
+    def chat_with_usage(
         self,
         messages: list[dict],
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 4096,
-    ) -> str:
+        response_format: Optional[dict] = None,
+    ) -> tuple[str, LLMUsage]:
         """
         Send a chat completion request with exponential backoff.
         
@@ -50,111 +793,628 @@ class LLMClient:
             model: Model to use (defaults to configured model)
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
+            response_format: Optional response format, e.g. {"type": "json_object"}
             
         Returns:
-            The assistant's response content
+            The assistant's response content and its token usage
         """
         model = model or self.model
-        last_error = None
+        self._validate_request(model, messages, max_tokens)
+        
+        cache_key = self._cache_key(model, messages, temperature, max_tokens, response_format)
+        semantic_scope = embedding = None
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached, LLMUsage()
+            
+            if self.semantic_cache:
+                semantic_scope = self._semantic_scope(
+                    model, messages, temperature, max_tokens, response_format
+                )
+                embedding = self.embed(self._user_text(messages))
+                cached = self._semantic_get(semantic_scope, cache_key, embedding)
+                if cached is not None:
+                    return cached, LLMUsage()
+        
+        input_tokens = self._input_tokens(model, messages, max_tokens)
+        
+        # Single-flight: an identical deterministic request already in flight
+        # shares its result instead of going to the API again
+        future = None
+        if cache_key is not None:
+            with self._pending_lock:
+                pending = self._pending.get(cache_key)
+                if pending is None:
+                    future = self._pending[cache_key] = Future()
+            if pending is not None:
+                logger.debug("Waiting on identical in-flight LLM call")
+                return pending.result(), LLMUsage()
         
+        try:
+            content, usage = self._complete(
+                model, messages, temperature, max_tokens, response_format, input_tokens
+            )
+        except BaseException as e:
+            if future is not None:
+                future.set_exception(e)
+            raise
+        else:
+            if cache_key is not None and content is not None:
+                self._cache_put(cache_key, content)
+                if semantic_scope is not None and embedding is not None:
+                    self._semantic_put(semantic_scope, cache_key, embedding, content)
+            if future is not None:
+                future.set_result(content)
+            return content, usage
+        finally:
+            if future is not None:
+                with self._pending_lock:
+                    self._pending.pop(cache_key, None)
+    
+    def _complete(
+        self,
+        model: str,
+        messages: list[dict],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[dict],
+        input_tokens: Optional[int],
+    ) -> tuple[str, LLMUsage]:
+        """Run one completion request through the retry loop."""
+        last_error = None
         for attempt in range(self.max_retries):
+            self._throttle(max_tokens, input_tokens)
+            started = time.perf_counter()
             try:
                 response = self.client.chat.completions.create(
                     model=model,
                     messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens,
+                    response_format=response_format or NOT_GIVEN,
                 )
-                logger.debug(f"LLM call successful after {attempt + 1} attempt(s)")
-                return response.choices[0].message.content
-            
-            except RateLimitError as e:
-                # Rate limited - retry with backoff
-                wait_time = self.base_delay * (2 ** attempt)
-                logger.warning(
-                    f"Rate limited (429). Retrying in {wait_time}s "
-                    f"(attempt {attempt + 1}/{self.max_retries})"
-                )
+                self._record_success(time.perf_counter() - started)
+                logger.debug("LLM call successful after %d attempt(s)", attempt + 1)
+                content = response.choices[0].message.content
+                return content, LLMUsage.from_completion(response.usage)
+            
+            except Exception as e:
                 last_error = e
-                time.sleep(wait_time)
-                
-            except APIConnectionError as e:
-                # Connection error - retry with backoff
-                wait_time = self.base_delay * (2 ** attempt)
-                logger.warning(
-                    f"Connection error. Retrying in {wait_time}s "
-                    f"(attempt {attempt + 1}/{self.max_retries}): {e}"
+                time.sleep(self._backoff(e, attempt))
+        
+        # All retries exhausted
+        raise self._retries_exhausted(last_error)
+    
+    def _throttle(self, max_tokens: int, input_tokens: Optional[int]) -> None:
+        """Wait for the RPM/TPM buckets to admit one more request."""
+        waited = 0.0
+        if self._req_bucket is not None:
+            waited += self._req_bucket.acquire(1)
+        if self._tok_bucket is not None:
+            waited += self._tok_bucket.acquire(input_tokens + max_tokens)
+        if waited:
+            logger.debug("Rate limiter delayed request by %.2fs", waited)
+    
+    def chat_stream(
+        self,
+        messages: list[dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        response_format: Optional[dict] = None,
+    ) -> Iterator[str]:
+        """
+        Stream a chat completion, yielding content as it arrives.
+        
+        Only opening the stream is retried; an error once tokens have been
+        yielded is raised to the caller. Streamed responses bypass the
+        response cache.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model to use (defaults to configured model)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response
+            response_format: Optional response format, e.g. {"type": "json_object"}
+            
+        Yields:
+            Content deltas in order
+        """
+        model = model or self.model
+        self._validate_request(model, messages, max_tokens)
+        input_tokens = self._input_tokens(model, messages, max_tokens)
+        last_error = None
+        stream = None
+        
+        for attempt in range(self.max_retries):
+            self._throttle(max_tokens, input_tokens)
+            try:
+                stream = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format or NOT_GIVEN,
+                    stream=True,
                 )
+                self._record_success(None)
+                break
+            except Exception as e:
                 last_error = e
-                time.sleep(wait_time)
-                
-            except APITimeoutError as e:
-                # Timeout - retry with backoff
-                wait_time = self.base_delay * (2 ** attempt)
-                logger.warning(
-                    f"Request timeout. Retrying in {wait_time}s "
-                    f"(attempt {attempt + 1}/{self.max_retries})"
+                time.sleep(self._backoff(e, attempt))
+        
+        if stream is None:
+            raise self._retries_exhausted(last_error)
+        
+        with stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    
+    def structured_chat(
+        self,
+        system_prompt: str,
+        user_message: str,
+        cacheable_system: bool = False,
+        with_usage: bool = False,
+        *,
+        cache_prefix: Optional[str] = None,
+        **kwargs,
+    ) -> Union[str, tuple[str, LLMUsage]]:
+        """
+        Convenience method for structured chat with system and user messages.
+        
+        Args:
+            system_prompt: The system instruction
+            user_message: The user's query
+            cacheable_system: Mark the system prompt with an ephemeral
+                cache_control block so Anthropic/Gemini models served by
+                LiteLLM can reuse it as a cached prefix (~5 minute TTL)
+            with_usage: Also return the call's LLMUsage
+            cache_prefix: Static instructions placed before the system
+                prompt and marked as the cached prefix; keep per-call
+                content out of it
+            **kwargs: Additional arguments passed to chat()
+            
+        Returns:
+            The assistant's response content, or (content, usage) when
+            with_usage is set
+        """
+        messages = self._structured_messages(
+            system_prompt, user_message, cacheable_system, cache_prefix
+        )
+        if with_usage:
+            return self.chat_with_usage(messages, **kwargs)
+        return self.chat(messages, **kwargs)
+    
+    async def coalesced_chat(
+        self,
+        system_prompt: str,
+        user_message: str,
+        **kwargs,
+    ) -> Union[str, tuple[str, LLMUsage]]:
+        """
+        Async structured_chat() that shares one call among identical requests.
+        
+        The blocking call runs in a worker thread. Concurrent callers with
+        the same prompts and arguments await the same task instead of
+        issuing duplicate LLM requests.
+        
+        Args:
+            system_prompt: The system instruction
+            user_message: The user's query
+            **kwargs: Additional arguments passed to structured_chat()
+            
+        Returns:
+            The structured_chat() result
+        """
+        key = hashlib.blake2b(
+            json.dumps(
+                [system_prompt, user_message, kwargs], sort_keys=True, default=str
+            ).encode("utf-8")
+        ).hexdigest()
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                asyncio.to_thread(
+                    self.structured_chat, system_prompt, user_message, **kwargs
                 )
-                last_error = e
-                time.sleep(wait_time)
-                
-            except APIError as e:
-                # Other API errors
-                status_code = getattr(e, 'status_code', None)
-                if status_code == 429:
-                    wait_time = self.base_delay * (2 ** attempt)
-                    logger.warning(
-                        f"Rate limited (429). Retrying in {wait_time}s "
-                        f"(attempt {attempt + 1}/{self.max_retries})"
-                    )
-                    last_error = e
-                    time.sleep(wait_time)
-                elif status_code and status_code >= 500:
-                    # Server error - retry
-                    wait_time = self.base_delay * (2 ** attempt)
-                    logger.warning(
-                        f"Server error ({status_code}). Retrying in {wait_time}s "
-                        f"(attempt {attempt + 1}/{self.max_retries})"
-                    )
-                    last_error = e
-                    time.sleep(wait_time)
-                else:
-                    # Client error - don't retry
-                    logger.error(f"API Error: {e}")
-                    raise
-                    
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug("Joining identical in-flight LLM request")
+        
+        # Shield so one caller's cancellation doesn't cancel the shared call
+        return await asyncio.shield(task)
+    
+    def embed(self, text: str) -> Optional[Sequence[float]]:
+        """
+        Embed text for semantic cache lookups.
+        
+        Uses the local ONNX model when LITELLM_LOCAL_EMBEDDING_MODEL is
+        set, otherwise the remote embedding model.
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            The embedding vector, or None if no embedding model is
+            configured or the request fails
+        """
+        local = self._local()
+        if local is not None:
+            try:
+                return local.embed(text)
             except Exception as e:
-                logger.error(f"Unexpected error: {type(e).__name__}: {e}")
-                raise
+                logger.warning("Local embedding failed: %s: %s", type(e).__name__, e)
+                return None
+        
+        if not self.embedding_model:
+            return None
+        
+        try:
+            response = self.client.embeddings.create(
+                model=self.embedding_model,
+                input=text,
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning("Embedding request failed: %s: %s", type(e).__name__, e)
+            return None
+
+
+class AsyncLLMClient(_LLMClientBase):
+    """
+    Asyncio client for the LiteLLM API.
+    
+    Same caching and retry policy as LLMClient, but requests and backoff
+    waits never block the event loop.
+    """
+    
+    def _create_client(self) -> AsyncOpenAI:
+        return _shared_client("async", self.api_key, self.base_url)
+    
+    async def chat(self, messages: list[dict], **kwargs) -> str:
+        """
+        Send a chat completion request with exponential backoff.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            **kwargs: Additional arguments passed to chat_with_usage()
+            
+        Returns:
+            The assistant's response content
+        """
+        return (await self.chat_with_usage(messages, **kwargs))[0]
+    
+    async def chat_with_usage(
+        self,
+        messages: list[dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        response_format: Optional[dict] = None,
+    ) -> tuple[str, LLMUsage]:
+        """
+        Send a chat completion request with exponential backoff.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model to use (defaults to configured model)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response
+            response_format: Optional response format, e.g. {"type": "json_object"}
+            
+        Returns:
+            The assistant's response content and its token usage
+        """
+        model = model or self.model
+        self._validate_request(model, messages, max_tokens)
+        last_error = None
+        
+        cache_key = self._cache_key(model, messages, temperature, max_tokens, response_format)
+        semantic_scope = embedding = None
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached, LLMUsage()
+            
+            if self.semantic_cache:
+                semantic_scope = self._semantic_scope(
+                    model, messages, temperature, max_tokens, response_format
+                )
+                embedding = await self.embed(self._user_text(messages))
+                cached = self._semantic_get(semantic_scope, cache_key, embedding)
+                if cached is not None:
+                    return cached, LLMUsage()
+        
+        input_tokens = self._input_tokens(model, messages, max_tokens)
+        for attempt in range(self.max_retries):
+            await self._throttle(max_tokens, input_tokens)
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format or NOT_GIVEN,
+                )
+                self._record_success(time.perf_counter() - started)
+                logger.debug("LLM call successful after %d attempt(s)", attempt + 1)
+                content = response.choices[0].message.content
+                if cache_key is not None and content is not None:
+                    self._cache_put(cache_key, content)
+                    if semantic_scope is not None and embedding is not None:
+                        self._semantic_put(semantic_scope, cache_key, embedding, content)
+                return content, LLMUsage.from_completion(response.usage)
+            
+            except Exception as e:
+                last_error = e
+                await asyncio.sleep(self._backoff(e, attempt))
         
         # All retries exhausted
-        error_msg = f"Failed after {self.max_retries} retries. Last error: {last_error}"
-        logger.error(error_msg)
-        raise RuntimeError(error_msg)
+        raise self._retries_exhausted(last_error)
     
-    def structured_chat(
+    async def _throttle(self, max_tokens: int, input_tokens: Optional[int]) -> None:
+        """Wait for the RPM/TPM buckets to admit one more request."""
+        waited = 0.0
+        if self._req_bucket is not None:
+            waited += await self._req_bucket.acquire_async(1)
+        if self._tok_bucket is not None:
+            waited += await self._tok_bucket.acquire_async(input_tokens + max_tokens)
+        if waited:
+            logger.debug("Rate limiter delayed request by %.2fs", waited)
+    
+    async def chat_stream(
+        self,
+        messages: list[dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        response_format: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content as it arrives.
+        
+        Only opening the stream is retried; an error once tokens have been
+        yielded is raised to the caller. Streamed responses bypass the
+        response cache.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model to use (defaults to configured model)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response
+            response_format: Optional response format, e.g. {"type": "json_object"}
+            
+        Yields:
+            Content deltas in order
+        """
+        model = model or self.model
+        self._validate_request(model, messages, max_tokens)
+        input_tokens = self._input_tokens(model, messages, max_tokens)
+        last_error = None
+        stream = None
+        
+        for attempt in range(self.max_retries):
+            await self._throttle(max_tokens, input_tokens)
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format or NOT_GIVEN,
+                    stream=True,
+                )
+                self._record_success(None)
+                break
+            except Exception as e:
+                last_error = e
+                await asyncio.sleep(self._backoff(e, attempt))
+        
+        if stream is None:
+            raise self._retries_exhausted(last_error)
+        
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    
+    async def structured_chat(
         self,
         system_prompt: str,
         user_message: str,
+        cacheable_system: bool = False,
+        with_usage: bool = False,
+        *,
+        cache_prefix: Optional[str] = None,
         **kwargs,
-    ) -> str:
+    ) -> Union[str, tuple[str, LLMUsage]]:
         """
         Convenience method for structured chat with system and user messages.
         
         Args:
             system_prompt: The system instruction
             user_message: The user's query
+            cacheable_system: Mark the system prompt as a cacheable prefix
+            with_usage: Also return the call's LLMUsage
+            cache_prefix: Static instructions placed before the system
+                prompt and marked as the cached prefix; keep per-call
+                content out of it
             **kwargs: Additional arguments passed to chat()
             
         Returns:
-            The assistant's response content
+            The assistant's response content, or (content, usage) when
+            with_usage is set
         """
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
+        messages = self._structured_messages(
+            system_prompt, user_message, cacheable_system, cache_prefix
+        )
+        if with_usage:
+            return await self.chat_with_usage(messages, **kwargs)
+        return await self.chat(messages, **kwargs)
+    
+    async def chat_many(
+        self,
+        batch: list[list[dict]],
+        max_concurrency: int = 50,
+        **kwargs,
+    ) -> list[Union[str, BaseException]]:
+        """
+        Run many chat completions concurrently.
+        
+        Args:
+            batch: One message list per completion
+            max_concurrency: Maximum requests in flight at once
+            **kwargs: Additional arguments passed to chat()
+            
+        Returns:
+            Responses in batch order; a failed request yields its exception
+            instead of cancelling the rest
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def one(messages: list[dict]) -> str:
+            async with semaphore:
+                return await self.chat(messages, **kwargs)
+        
+        return await asyncio.gather(
+            *(one(messages) for messages in batch), return_exceptions=True
+        )
+    
+    async def chat_batch(
+        self,
+        prompts: list[str],
+        system: Optional[str] = None,
+        max_batch_size: int = BATCH_MAX_PROMPTS,
+        max_concurrency: int = 50,
+        **kwargs,
+    ) -> list[Union[str, BaseException]]:
+        """
+        Answer many short, independent prompts with few requests.
+        
+        Up to max_batch_size prompts are numbered and packed into a single
+        chat request, and the answers are matched back by number. Packed
+        requests run concurrently through chat_many(); prompts whose answer
+        is missing from the reply are retried on their own.
+        
+        Args:
+            prompts: The user prompts
+            system: Optional system instruction shared by every prompt
+            max_batch_size: Maximum prompts per request
+            max_concurrency: Maximum requests in flight at once
+            **kwargs: Additional arguments passed to chat()
+            
+        Returns:
+            Answers in prompt order; a failed prompt yields its exception
+        """
+        batches = [
+            prompts[start:start + max_batch_size]
+            for start in range(0, len(prompts), max_batch_size)
         ]
-        return self.chat(messages, **kwargs)
+        # JSON mode unless the caller chose a response_format; the copy keeps
+        # the default out of the individual retries below
+        batch_kwargs = dict(kwargs)
+        batch_kwargs.setdefault("response_format", {"type": "json_object"})
+        replies = await self.chat_many(
+            [self._batch_messages(batch, system) for batch in batches],
+            max_concurrency=max_concurrency,
+            **batch_kwargs,
+        )
+        
+        answers: list[Union[str, BaseException, None]] = []
+        for batch, reply in zip(batches, replies):
+            if isinstance(reply, BaseException):
+                answers.extend([None] * len(batch))
+            else:
+                answers.extend(self._split_batch(reply, len(batch)))
+        
+        missing = [index for index, answer in enumerate(answers) if answer is None]
+        if missing:
+            logger.debug("Retrying %d unbatched prompt(s) individually", len(missing))
+            retried = await self.chat_many(
+                [
+                    self._structured_messages(system, prompts[index], False)
+                    if system else [{"role": "user", "content": prompts[index]}]
+                    for index in missing
+                ],
+                max_concurrency=max_concurrency,
+                **kwargs,
+            )
+            for index, answer in zip(missing, retried):
+                answers[index] = answer
+        
+        return answers
+    
+    async def embed(self, text: str) -> Optional[Sequence[float]]:
+        """
+        Embed text for semantic cache lookups.
+        
+        Uses the local ONNX model when LITELLM_LOCAL_EMBEDDING_MODEL is
+        set, otherwise the remote embedding model.
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            The embedding vector, or None if no embedding model is
+            configured or the request fails
+        """
+        local = self._local()
+        if local is not None:
+            try:
+                return await asyncio.wrap_future(local.submit(text))
+            except Exception as e:
+                logger.warning("Local embedding failed: %s: %s", type(e).__name__, e)
+                return None
+        
+        if not self.embedding_model:
+            return None
+        
+        try:
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=text,
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning("Embedding request failed: %s: %s", type(e).__name__, e)
+            return None
+
+
+class _LazyLLMClient:
+    """
+    Stand-in for the global LLMClient that builds it on first use.
+    
+    Importing this module therefore doesn't create an API client; every
+    attribute access is forwarded to the real instance.
+    """
+    
+    def __init__(self):
+        self._instance: Optional[LLMClient] = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> LLMClient:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = LLMClient()
+        return self._instance
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
 
 
-# Global LLM client instance
-llm_client = LLMClient()
\ No newline at end of file
+# Global LLM client instance (created lazily)
+llm_client = _LazyLLMClient()
\ No newline at end of file
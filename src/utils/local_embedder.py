@@ -0,0 +1,139 @@
+"""
+Local sentence embeddings for semantic cache lookups.
+Runs a small ONNX encoder (e.g. all-MiniLM-L6-v2) on the CPU instead of
+calling the remote embedding endpoint on every cache lookup. Requires the
+optional onnxruntime and tokenizers packages.
+"""
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Concurrent embed() calls arriving within this window share one session.run()
+EMBED_BATCH_WINDOW = 0.002
+EMBED_MAX_BATCH = 32
+EMBED_MAX_TOKENS = 256
+
+_EMBEDDERS: dict[str, "LocalEmbedder"] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+
+class LocalEmbedder:
+    """
+    Mean-pooled, L2-normalized sentence embeddings from an ONNX encoder.
+
+    One InferenceSession is shared by all callers. Requests are queued and
+    a worker thread runs them in batches, so concurrent chat() calls cost
+    a single forward pass. Vectors are returned as float16.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: Optional[str] = None,
+        max_tokens: int = EMBED_MAX_TOKENS,
+        max_batch: int = EMBED_MAX_BATCH,
+        batch_window: float = EMBED_BATCH_WINDOW,
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "LocalEmbedder requires the 'onnxruntime' and 'tokenizers' packages"
+            ) from e
+
+        tokenizer_path = tokenizer_path or str(Path(model_path).with_name("tokenizer.json"))
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="local-embedder", daemon=True)
+        self._worker.start()
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text, blocking until its batch has run.
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            The normalized float16 embedding
+        """
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text; the future resolves to its embedding."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of texts in one forward pass."""
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(
+            None, {name: value for name, value in feeds.items() if name in self._input_names}
+        )[0]
+
+        # Mean over real (unpadded) tokens, then unit length for cosine search
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float16)
+
+    def _run(self) -> None:
+        """Drain the queue in small batches and resolve each caller's future."""
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.batch_window))
+            except queue.Empty:
+                pass
+
+            try:
+                vectors = self.encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def get_local_embedder(model_path: str, tokenizer_path: Optional[str] = None) -> LocalEmbedder:
+    """The process-wide LocalEmbedder for a model file, created on first use."""
+    with _EMBEDDERS_LOCK:
+        embedder = _EMBEDDERS.get(model_path)
+        if embedder is None:
+            embedder = LocalEmbedder(model_path, tokenizer_path)
+            _EMBEDDERS[model_path] = embedder
+            logger.info("Loaded local embedding model %s", model_path)
+        return embedder
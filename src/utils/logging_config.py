@@ -1,22 +1,49 @@
-import logging
 import sys
+import queue
+import atexit
+import logging
+import logging.handlers
 from src.config import config
 
+_LEVEL = getattr(logging, config.log_level.upper(), logging.INFO)
+
+# Set once the queue listener is running; later calls reuse it
+_CONFIGURED = False
+
 
 def setup_logging():
-    """Configure application logging."""
-    log_level = getattr(logging, config.log_level.upper(), logging.INFO)
+    """
+    Configure application logging.
+    
+    Log calls only enqueue the record; a listener thread formats it and
+    writes to stdout, keeping stream I/O and its lock off the caller.
+    """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return logging.getLogger("spike_ai")
     
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-        ],
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     )
     
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Only merges message args (and any traceback) before enqueueing; the
+    # full format is applied by stream_handler on the listener thread
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logging.basicConfig(level=_LEVEL, handlers=[queue_handler])
+    
     # Reduce noise from external libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     
-    return logging.getLogger("spike_ai")
\ No newline at end of file
+    _CONFIGURED = True
+    return logging.getLogger("spike_ai")
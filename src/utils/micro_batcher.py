@@ -0,0 +1,111 @@
+"""
+Micro-batching of independent LLM prompts.
+Prompts submitted within a short window are packed into one
+AsyncLLMClient.chat_batch() request instead of one request each.
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+
+from .llm_client import AsyncLLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects prompts for up to batch_interval_ms, or until max_batch_size
+    are waiting, and answers them with a single packed request.
+
+    Meant for bursty, non-latency-critical callers such as per-row
+    enrichment; each prompt waits at most one interval before it is sent.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncLLMClient] = None,
+        system: Optional[str] = None,
+        batch_interval_ms: float = 10,
+        max_batch_size: int = 10,
+        **chat_kwargs: Any,
+    ):
+        self.client = client
+        self.system = system
+        self.batch_interval = batch_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.chat_kwargs = chat_kwargs
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatched: set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str) -> str:
+        """
+        Queue a prompt and wait for its answer.
+
+        Args:
+            prompt: The user prompt
+
+        Returns:
+            The answer to this prompt
+        """
+        self._ensure_worker()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Start the collecting worker on the running loop if it isn't running there."""
+        if self.client is None:
+            self.client = AsyncLLMClient()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # A queue and task belong to the loop that created them
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._dispatched = set()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Collect prompts into batches and dispatch each batch as it closes."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_interval
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            logger.debug("Dispatching micro-batch of %d prompt(s)", len(batch))
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatched.add(task)
+            task.add_done_callback(self._dispatched.discard)
+
+    async def _dispatch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Send one packed request and resolve each caller's future."""
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            answers = await self.client.chat_batch(
+                prompts,
+                system=self.system,
+                max_batch_size=self.max_batch_size,
+                **self.chat_kwargs,
+            )
+        except Exception as e:
+            answers = [e] * len(batch)
+
+        for (_, future), answer in zip(batch, answers):
+            if future.done():
+                continue
+            if isinstance(answer, BaseException):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
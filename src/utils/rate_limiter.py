@@ -0,0 +1,65 @@
+"""
+Client-side rate limiting for LLM requests.
+Keeps request and token throughput under the provider's RPM/TPM limits so
+calls wait locally instead of drawing 429s and retry storms.
+"""
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate_per_sec, holding at most capacity tokens.
+
+    Acquiring reserves tokens immediately, letting the balance go negative,
+    and waits until the refill covers the debt. Callers are therefore
+    served in arrival order, and a request larger than the capacity still
+    goes through once enough time has passed. Safe to share between
+    threads and event loops.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens from the bucket and return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until tokens are available.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """Non-blocking acquire() for coroutines."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def per_minute_bucket(limit: int) -> TokenBucket:
+    """Bucket for a per-minute limit, allowing a full minute's burst."""
+    return TokenBucket(rate_per_sec=limit / 60, capacity=limit)
@@ -0,0 +1,79 @@
+"""
+JSON serialization helpers built on orjson.
+Agents can hand back DataFrames; they are converted to records only when
+the payload is finally encoded.
+"""
+import re
+import json
+from typing import Any, Optional
+
+import orjson
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+_JSON_DECODER = json.JSONDecoder()
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def frame_records(df: Any) -> list[dict]:
+    """Convert a DataFrame to a list of row dicts via Arrow."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False).to_pylist()
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it doesn't encode natively."""
+    import pandas as pd
+
+    if isinstance(obj, pd.DataFrame):
+        return frame_records(obj)
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize to JSON bytes, encoding DataFrames as lists of records.
+
+    Args:
+        obj: The value to serialize
+        indent: Pretty-print with two-space indentation
+
+    Returns:
+        The UTF-8 encoded JSON document
+    """
+    option = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else ORJSON_OPTIONS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """
+    Parse the first JSON value starting at the first '{' in an LLM response.
+
+    orjson handles the common case of a bare object; raw_decode stops at the
+    end of the first object, so trailing code fences, prose or further
+    objects don't break parsing. Trailing commas, a common LLM slip, are
+    stripped as a last resort.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    try:
+        return orjson.loads(text[start:])
+    except orjson.JSONDecodeError:
+        pass
+
+    try:
+        value, _ = _JSON_DECODER.raw_decode(text, start)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    end = text.rfind("}") + 1
+    try:
+        return orjson.loads(_TRAILING_COMMA_RE.sub(r"\1", text[start:end]))
+    except orjson.JSONDecodeError:
+        return None
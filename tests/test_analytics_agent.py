@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.agents import analytics_agent
+from src.agents.analytics_agent import AnalyticsAgent
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """An AnalyticsAgent whose parse calls and embeddings are recorded."""
+    agent = AnalyticsAgent()
+    parses = []
+
+    async def fake_submit(kind, system_prompt, query, **kwargs):
+        parses.append(query)
+        return '{"metrics": ["sessions"], "date_range": {"type": "relative", "days": 7}}', None
+
+    monkeypatch.setattr(agent._scheduler, "submit", fake_submit)
+    monkeypatch.setattr(analytics_agent, "_log_usage", lambda kind, usage: None)
+    # Every query embeds identically, so any semantic lookup would hit
+    monkeypatch.setattr(analytics_agent.llm_client, "embed", lambda text: [1.0, 0.0])
+    return agent, parses
+
+
+def test_semantic_plan_lookup_respects_the_switch(agent, monkeypatch):
+    agent, parses = agent
+    monkeypatch.setattr(analytics_agent.config.litellm, "semantic_cache", False)
+
+    asyncio.run(agent._parse_query("sessions for the last week"))
+    asyncio.run(agent._parse_query("sessions over the past week"))
+    assert len(parses) == 2
+
+
+def test_semantic_plan_hit_requires_matching_numbers(agent, monkeypatch):
+    agent, parses = agent
+    monkeypatch.setattr(analytics_agent.config.litellm, "semantic_cache", True)
+
+    asyncio.run(agent._parse_query("sessions for the last 7 days"))
+    asyncio.run(agent._parse_query("Sessions over the last 7 days"))
+    assert len(parses) == 1
+
+    asyncio.run(agent._parse_query("sessions for the last 30 days"))
+    assert len(parses) == 2
+
+
+def test_exact_plan_hit_skips_the_llm(agent, monkeypatch):
+    agent, parses = agent
+    monkeypatch.setattr(analytics_agent.config.litellm, "semantic_cache", False)
+
+    first = asyncio.run(agent._parse_query("Top 10 pages by sessions"))
+    second = asyncio.run(agent._parse_query("top 10  pages by sessions"))
+    assert first == second
+    assert len(parses) == 1
+
+
+def test_batch_isolates_a_malformed_plan(agent, monkeypatch):
+    agent, parses = agent
+    monkeypatch.setattr(analytics_agent.config.litellm, "semantic_cache", False)
+
+    parsed = []
+
+    async def fake_parse(query):
+        parsed.append(query)
+        if query == "bad":
+            return {"metrics": None}
+        return {"metrics": ["sessions"], "date_range": {"type": "relative", "days": 7}}
+
+    async def fake_execute(jobs):
+        return [RuntimeError("no GA4 in tests")] * len(jobs)
+
+    monkeypatch.setattr(agent, "_parse_query", fake_parse)
+    monkeypatch.setattr(agent, "_execute_queries", fake_execute)
+
+    responses = asyncio.run(
+        agent.process_batch([("bad", "123"), ("good", "123"), ("no property", "")])
+    )
+
+    assert [r.success for r in responses] == [False, False, False]
+    assert "NoneType" in responses[0].error
+    assert responses[1].error == "no GA4 in tests"
+    assert "propertyId" in responses[2].error
+    assert sorted(parsed) == ["bad", "good"]
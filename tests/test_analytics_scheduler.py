@@ -0,0 +1,53 @@
+import asyncio
+
+from src.agents import analytics_scheduler
+from src.agents.analytics_scheduler import AnalyticsBatchScheduler
+from src.utils.llm_client import CACHE_PREFIX_MIN_CHARS
+
+
+def _recording_chat(monkeypatch):
+    events = []
+
+    async def fake_chat(system, user, **kwargs):
+        events.append(("start", user))
+        await asyncio.sleep(0.01)
+        events.append(("end", user))
+        return user.upper()
+
+    monkeypatch.setattr(analytics_scheduler.llm_client, "coalesced_chat", fake_chat)
+    return events
+
+
+def _burst(scheduler, system_prompt):
+    async def main():
+        return await asyncio.gather(
+            scheduler.submit("parse", system_prompt, "a1"),
+            scheduler.submit("parse", system_prompt, "a2"),
+            scheduler.submit("parse", system_prompt, "a3"),
+        )
+    return asyncio.run(main())
+
+
+def test_first_call_of_a_cacheable_group_warms_the_prefix(monkeypatch):
+    events = _recording_chat(monkeypatch)
+    scheduler = AnalyticsBatchScheduler(window=0.02)
+
+    assert _burst(scheduler, "x" * CACHE_PREFIX_MIN_CHARS) == ["A1", "A2", "A3"]
+    # a2 and a3 start only after a1 has finished
+    assert events[:2] == [("start", "a1"), ("end", "a1")]
+
+
+def test_short_prompt_groups_are_sent_at_once(monkeypatch):
+    events = _recording_chat(monkeypatch)
+    scheduler = AnalyticsBatchScheduler(window=0.02)
+
+    assert _burst(scheduler, "system A") == ["A1", "A2", "A3"]
+    assert [kind for kind, _ in events[:3]] == ["start"] * 3
+
+
+def test_scheduler_survives_a_new_event_loop(monkeypatch):
+    _recording_chat(monkeypatch)
+    scheduler = AnalyticsBatchScheduler(window=0.01)
+
+    assert asyncio.run(scheduler.submit("parse", "system", "first")) == "FIRST"
+    assert asyncio.run(scheduler.submit("parse", "system", "second")) == "SECOND"
@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.agents.analytics_agent import SUMMARY_MAX_FULL_ROWS, summarize_report
+
+
+def _report(columns, metric_types):
+    n_rows = len(next(iter(columns.values())))
+    return {
+        "columns": {name: np.asarray(values) for name, values in columns.items()},
+        "dimension_headers": ["pagePath"],
+        "metric_headers": list(metric_types),
+        "metric_types": metric_types,
+        "totals": {},
+        "row_count": n_rows,
+        "metadata": {"metrics": [], "dimensions": [], "date_range": {"start": "", "end": ""}},
+    }
+
+
+def test_aggregates_sum_counts_currency_and_durations_but_average_rates():
+    n = SUMMARY_MAX_FULL_ROWS + 1
+    report = _report(
+        {
+            "pagePath": np.array([f"/p{i}" for i in range(n)], dtype=object),
+            "sessions": np.full(n, 2, dtype=np.int64),
+            "totalRevenue": np.full(n, 1.5),
+            "userEngagementDuration": np.full(n, 10.0),
+            "averageSessionDuration": np.full(n, 30.0),
+            "bounceRate": np.full(n, 0.25),
+        },
+        {
+            "sessions": "TYPE_INTEGER",
+            "totalRevenue": "TYPE_CURRENCY",
+            "userEngagementDuration": "TYPE_SECONDS",
+            "averageSessionDuration": "TYPE_SECONDS",
+            "bounceRate": "TYPE_FLOAT",
+        },
+    )
+
+    aggregates = summarize_report(report)["aggregates"]
+
+    assert aggregates["sessions"] == 2 * n
+    assert aggregates["totalRevenue"] == 1.5 * n
+    assert aggregates["userEngagementDuration"] == 10.0 * n
+    assert aggregates["averageSessionDuration"] == 30.0
+    assert aggregates["bounceRate"] == 0.25
@@ -0,0 +1,34 @@
+import time
+
+from src.utils import MemoryLRU, SQLiteBackend
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = MemoryLRU(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_memory_lru_expires_entries():
+    cache = MemoryLRU()
+    cache.set("a", "1", ttl=-1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_backend_persists_and_counts_only_live_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteBackend(path)
+    cache.set("live", "kept", ttl=60)
+    cache.set("dead", "gone", ttl=-10)
+
+    assert len(cache) == 1
+    assert cache.get("dead") is None
+
+    reopened = SQLiteBackend(path)
+    assert reopened.get("live") == "kept"
+    assert len(reopened) == 1
@@ -0,0 +1,232 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+import orjson
+import pytest
+from openai import APIStatusError, AsyncOpenAI, OpenAI
+
+from src.utils import MemoryLRU
+
+# src.utils re-exports the llm_client instance under the module's name
+llm_module = sys.modules["src.utils.llm_client"]
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+    }
+
+
+@pytest.fixture
+def make_client():
+    """
+    Build an LLMClient whose HTTP calls are answered by `responses` in order
+    (the last one repeats), returning the client and the request bodies sent.
+    """
+    def build(responses, **kwargs):
+        requests = []
+        queue = list(responses)
+
+        def handler(request):
+            requests.append(orjson.loads(request.content))
+            status, body, headers = queue.pop(0) if len(queue) > 1 else queue[0]
+            return httpx.Response(status, json=body, headers=headers)
+
+        for name, value in (("base_delay", 0.001), ("max_delay", 0.01), ("rpm", 0), ("tpm", 0)):
+            kwargs.setdefault(name, value)
+        client = llm_module.LLMClient(
+            api_key="test", base_url="http://llm.test/v1", model="test-model",
+            cache_backend=MemoryLRU(), semantic_cache=False, **kwargs
+        )
+        client.client = OpenAI(
+            api_key="test",
+            base_url="http://llm.test/v1",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+            max_retries=0,
+        )
+        return client, requests
+    return build
+
+
+def _ok(content: str = "ok") -> tuple:
+    return 200, _completion(content), {}
+
+
+def _error(status: int, headers: Optional[dict] = None) -> tuple:
+    return status, {"error": {"message": f"status {status}"}}, headers or {}
+
+
+def test_tokens_are_counted_once_per_request_and_not_on_cache_hits(make_client, monkeypatch):
+    counted = []
+    real_count_tokens = llm_module.count_tokens
+    monkeypatch.setattr(
+        llm_module, "count_tokens",
+        lambda model, messages: counted.append(model) or real_count_tokens(model, messages),
+    )
+    client, requests = make_client(
+        [_error(503), _ok()],
+        tpm=1_000_000, context_window=100_000,
+    )
+    messages = [{"role": "user", "content": "hello"}]
+
+    assert client.chat(messages, temperature=0) == "ok"
+    assert len(requests) == 2
+    assert len(counted) == 1
+
+    assert client.chat(messages, temperature=0) == "ok"
+    assert len(counted) == 1
+
+
+def test_context_window_is_enforced_before_sending(make_client):
+    client, requests = make_client([_ok()], context_window=50)
+    with pytest.raises(ValueError, match="context window"):
+        client.chat([{"role": "user", "content": "word " * 200}], max_tokens=10)
+    assert requests == []
+
+
+def test_deterministic_calls_are_served_from_the_cache(make_client):
+    client, requests = make_client([_ok("cached")])
+    messages = [{"role": "user", "content": "hello"}]
+
+    assert client.chat(messages, temperature=0) == "cached"
+    assert client.chat(messages, temperature=0) == "cached"
+    assert len(requests) == 1
+    assert client.cache_stats()["hits"] == 1
+
+
+def test_sampled_calls_bypass_the_cache(make_client):
+    client, requests = make_client([_ok()])
+    messages = [{"role": "user", "content": "hello"}]
+
+    client.chat(messages, temperature=0.7)
+    client.chat(messages, temperature=0.7)
+    assert len(requests) == 2
+
+
+def test_backoff_is_capped_at_max_delay(make_client, monkeypatch):
+    waits = []
+    monkeypatch.setattr(llm_module.time, "sleep", waits.append)
+    client, _ = make_client(
+        [_error(503, {"retry-after": "120"})] * 3 + [_ok()], base_delay=1, max_delay=2
+    )
+
+    client.chat([{"role": "user", "content": "hi"}])
+    assert len(waits) == 3
+    assert all(0 <= wait <= 2 for wait in waits)
+
+
+def test_retry_after_header_sets_the_minimum_wait(make_client, monkeypatch):
+    waits = []
+    monkeypatch.setattr(llm_module.time, "sleep", waits.append)
+    client, _ = make_client(
+        [_error(429, {"retry-after": "0.5"}), _ok()], base_delay=0.001, max_delay=10
+    )
+
+    client.chat([{"role": "user", "content": "hi"}])
+    assert waits == [0.5]
+
+
+def test_only_the_exhausted_limit_reset_is_waited_out(make_client, monkeypatch):
+    waits = []
+    monkeypatch.setattr(llm_module.time, "sleep", waits.append)
+    headers = {
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "250ms",
+        "x-ratelimit-remaining-tokens": "5000",
+        "x-ratelimit-reset-tokens": "6s",
+    }
+    client, _ = make_client([_error(429, headers), _ok()], base_delay=0.001, max_delay=10)
+
+    client.chat([{"role": "user", "content": "hi"}])
+    assert waits == [0.25]
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2", 2.0),
+    ("1.5", 1.5),
+    ("250ms", 0.25),
+    ("1m30s", 90.0),
+    ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    assert llm_module._parse_duration(value) == seconds
+
+
+def test_identical_concurrent_calls_share_one_request(make_client):
+    client, requests = make_client([_ok("shared")])
+    real_complete = client._complete
+
+    def slow_complete(*args):
+        time.sleep(0.05)
+        return real_complete(*args)
+
+    client._complete = slow_complete
+    messages = [{"role": "user", "content": "hello"}]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: client.chat(messages, temperature=0), range(8)))
+
+    assert results == ["shared"] * 8
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retriable_errors_are_retried(make_client, status):
+    client, requests = make_client([_error(status), _ok()])
+    assert client.chat([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(requests) == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 422])
+def test_client_errors_are_not_retried(make_client, status):
+    client, requests = make_client([_error(status)])
+    with pytest.raises(APIStatusError):
+        client.chat([{"role": "user", "content": "hi"}])
+    assert len(requests) == 1
+    assert client.get_metrics_snapshot()["client_errors"] == 1
+
+
+def test_invalid_requests_never_reach_the_api(make_client):
+    client, requests = make_client([_ok()])
+    with pytest.raises(ValueError):
+        client.chat([{"role": "robot", "content": "hi"}])
+    with pytest.raises(ValueError):
+        client.chat([{"role": "user", "content": "hi"}], max_tokens=0)
+    assert requests == []
+
+
+def test_chat_batch_accepts_a_caller_response_format():
+    bodies = []
+
+    async def handler(request):
+        body = orjson.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json=_completion('{"1": "a", "2": "b"}'))
+
+    client = llm_module.AsyncLLMClient(
+        api_key="test", base_url="http://llm.test/v1", model="test-model",
+        cache_backend=MemoryLRU(), semantic_cache=False, rpm=0, tpm=0,
+    )
+    client.client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://llm.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        max_retries=0,
+    )
+    response_format = {"type": "json_schema", "json_schema": {"name": "answers", "schema": {}}}
+
+    answers = asyncio.run(client.chat_batch(["p1", "p2"], response_format=response_format))
+    assert answers == ["a", "b"]
+    assert bodies[0]["response_format"] == response_format
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from src.utils import TokenBucket
+
+
+def test_bucket_allows_a_burst_up_to_capacity_then_waits():
+    bucket = TokenBucket(rate_per_sec=10, capacity=2)
+    assert bucket._reserve(1) == 0
+    assert bucket._reserve(1) == 0
+    assert bucket._reserve(1) == pytest.approx(0.1, abs=0.02)
+
+
+def test_oversized_request_waits_for_the_refill():
+    bucket = TokenBucket(rate_per_sec=100, capacity=5)
+    assert bucket._reserve(10) == pytest.approx(0.05, abs=0.01)
+
+
+def test_acquire_async_sleeps_without_blocking_the_loop():
+    bucket = TokenBucket(rate_per_sec=50, capacity=1)
+
+    async def main():
+        return await asyncio.gather(bucket.acquire_async(), bucket.acquire_async())
+
+    first, second = asyncio.run(main())
+    assert first == 0
+    assert second == pytest.approx(0.02, abs=0.01)
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from src.agents import AgentResponse
+from src.orchestrator import orchestrator as orchestrator_module
+from src.orchestrator.orchestrator import Orchestrator, _keyword_route
+from src.utils import LLMCache
+
+CROSS_AGENT_REPLY = (
+    '{"requires_analytics": true, "requires_seo": true, '
+    '"is_cross_agent": true, "reasoning": "ranking plus title tags"}'
+)
+
+
+class _StubAgent:
+    def __init__(self, keyword_re):
+        self._keyword_re = keyword_re
+
+    def can_handle(self, query: str) -> bool:
+        return self._keyword_re.search(query) is not None
+
+
+@pytest.fixture
+def router(monkeypatch):
+    """An Orchestrator with stub agents and a recording routing LLM."""
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    orchestrator.analytics_agent = _StubAgent(orchestrator_module._ANALYTICS_KEYWORDS_RE)
+    orchestrator.seo_agent = _StubAgent(orchestrator_module._SEO_KEYWORDS_RE)
+    orchestrator._intent_cache = LLMCache(ttl=60, max_entries=16)
+
+    calls = []
+
+    async def fake_chat(system, user, **kwargs):
+        calls.append(user)
+        return CROSS_AGENT_REPLY
+
+    monkeypatch.setattr(orchestrator_module.llm_client, "coalesced_chat", fake_chat)
+    return orchestrator, calls
+
+
+def test_seo_only_query_skips_the_llm(router):
+    orchestrator, calls = router
+    intent = asyncio.run(orchestrator._detect_intent("Which URLs do not use HTTPS?"))
+    assert intent.requires_seo and not intent.requires_analytics
+    assert intent.source == "keywords"
+    assert calls == []
+
+
+@pytest.mark.parametrize("query", [
+    "What are the top 10 pages by views and their title tags?",
+    "Top pages by views with their title tags",
+    "Show the top 20 pages by views along with their meta descriptions",
+])
+def test_cross_agent_readme_examples_are_not_routed_to_one_agent(router, query):
+    orchestrator, calls = router
+    intent = asyncio.run(orchestrator._detect_intent(query))
+    assert intent.requires_analytics and intent.requires_seo
+    assert intent.is_cross_agent
+
+
+def test_single_keyword_defers_to_the_llm():
+    # One coarse hit ("page view") isn't enough to bypass the router
+    assert _keyword_route("show me page views for the last 7 days") is None
+    assert _keyword_route("top pages by views and their title tags") is None
+
+
+def test_cross_phrasing_with_both_domains_routes_to_both():
+    intent = _keyword_route("top pages by page views with their title tags")
+    assert intent is not None
+    assert intent.is_cross_agent and intent.requires_analytics and intent.requires_seo
+
+
+def test_llm_routing_is_served_from_the_intent_cache(router):
+    orchestrator, calls = router
+    query = "What are the top 10 pages by views and their title tags?"
+    asyncio.run(orchestrator._detect_intent(query))
+    asyncio.run(orchestrator._detect_intent(query))
+    assert len(calls) == 1
+
+
+def test_fusion_does_not_block_the_event_loop(router, monkeypatch):
+    orchestrator, calls = router
+
+    def blocking_chat(*args, **kwargs):
+        raise AssertionError("synchronous LLM call inside the event loop")
+
+    monkeypatch.setattr(orchestrator_module.llm_client, "structured_chat", blocking_chat)
+    responses = [
+        AgentResponse(success=True, data={"rows": []}, message="", agent_name="analytics"),
+        AgentResponse(success=True, data={"urls": []}, message="", agent_name="seo"),
+    ]
+    intent = orchestrator_module._keyword_intent("top pages by page views with their title tags")
+
+    result = asyncio.run(orchestrator._fuse_responses("top pages", responses, intent))
+    assert result["success"] and result["cross_agent"]
+    assert len(calls) == 1
@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+
+from src.agents.seo_agent import SEOAgent, _ColumnLookup, _blank_mask, _length_mask
+
+COLUMNS = ["Address", "Title 1", "Meta Description 1", "Status Code", "Indexability"]
+
+
+@pytest.fixture(scope="module")
+def agent():
+    return SEOAgent()
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "Address": ["https://a.test/", "http://b.test/", "https://c.test/x"],
+            "Title 1": ["Short", "A much longer page title than the others", None],
+            "Meta Description 1": ["", "  ", "Described"],
+            "Status Code": ["200", "301", "200"],
+            "Indexability": ["Indexable", "Non-Indexable", "Indexable"],
+        },
+        dtype="string[pyarrow]",
+    )
+
+
+def test_no_https_query_is_planned_without_the_llm(agent, frame):
+    plan = agent._rule_based_plan("Which URLs do not use HTTPS?", frame)
+    assert plan["source"] == "rules"
+    assert plan["operation"] == "filter"
+    assert plan["filters"] == [{"column": "url", "operator": "not_contains", "value": "https"}]
+
+
+def test_length_and_group_by_rules(agent, frame):
+    plan = agent._rule_based_plan("Titles longer than 60 characters", frame)
+    assert plan["filters"] == [{"column": "title length", "operator": "greater", "value": "60"}]
+
+    plan = agent._rule_based_plan("Group all pages by indexability", frame)
+    assert plan["operation"] == "group"
+    assert plan["group_by"] == "Indexability"
+
+    plan = agent._rule_based_plan("Group by Status Code.", frame)
+    assert plan["group_by"] == "Status Code"
+
+
+@pytest.mark.parametrize("query", [
+    "Which URLs do not use HTTPS and have a canonical tag?",
+    "Group pages by favourite colour",
+    "Summarize the crawl",
+    "Group by indexability where word count is less than 300",
+    "Group by indexability for urls with a missing h1",
+    "Group pages by indexability excluding 404s",
+    "Group by indexability, only for pages with a missing h1",
+    "Group by status",
+])
+def test_unrecognized_queries_fall_back_to_the_llm(agent, frame, query):
+    assert agent._rule_based_plan(query, frame) is None
+
+
+def test_length_mask(frame):
+    assert _length_mask(frame["Title 1"], "greater", 10).tolist() == [False, True, False]
+    assert _length_mask(frame["Title 1"], "less", 10).tolist() == [True, False, False]
+
+
+def test_blank_mask_counts_missing_and_whitespace_cells(frame):
+    assert _blank_mask(frame["Meta Description 1"]).tolist() == [True, True, False]
+    assert _blank_mask(frame["Title 1"]).tolist() == [False, False, True]
+
+
+def test_column_lookup_prefers_exact_then_partial_then_aliases():
+    lookup = _ColumnLookup(COLUMNS)
+    assert lookup.find("status code") == "Status Code"
+    assert lookup.find("meta description") == "Meta Description 1"
+    assert lookup.find("url") == "Address"
+    assert lookup.find("word count") is None
+
+
+def test_total_matching_counts_rows_before_the_limit(agent, frame):
+    plan = {
+        "operation": "filter",
+        "filters": [{"column": "url", "operator": "contains", "value": "https"}],
+        "limit": 1,
+    }
+    result = agent._execute_analysis(frame, plan)
+
+    assert result["total_matching"] == 2
+    assert len(result["data"]) == 1
+    assert agent._format_response(plan, result, len(frame)).startswith("2 of 3 URLs")
+
+
+def test_null_operator_is_treated_as_equals(agent, frame):
+    plan = {
+        "operation": "filter",
+        "filters": [{"column": "status code", "operator": None, "value": "301"}],
+    }
+    result = agent._execute_analysis(frame, plan)
+
+    assert result["total_matching"] == 1
+    assert "status code equals 301" in agent._format_response(plan, result, len(frame))
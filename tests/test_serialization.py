@@ -0,0 +1,30 @@
+import numpy as np
+import orjson
+
+from src.utils import dumps, extract_json
+
+
+def test_extract_json_bare_object():
+    assert extract_json('{"a": 1}') == {"a": 1}
+
+
+def test_extract_json_ignores_fences_and_trailing_prose():
+    text = 'Here you go:\n```json\n{"a": {"b": [1, 2]}}\n```\nAnything else?'
+    assert extract_json(text) == {"a": {"b": [1, 2]}}
+
+
+def test_extract_json_takes_the_first_of_several_objects():
+    assert extract_json('{"a": 1} and also {"b": 2}') == {"a": 1}
+
+
+def test_extract_json_tolerates_trailing_commas():
+    assert extract_json('{"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+
+
+def test_extract_json_returns_none_without_an_object():
+    assert extract_json("no json here") is None
+    assert extract_json('{"a": ') is None
+
+
+def test_dumps_encodes_numpy_values():
+    assert orjson.loads(dumps({"counts": np.array([1, 2])})) == {"counts": [1, 2]}